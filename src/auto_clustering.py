@@ -0,0 +1,233 @@
+from typing import Any, Dict, List, Optional
+import logging
+import math
+import random
+import time
+import numpy as np
+
+from src.rc_extract import get_rc_updated
+from src.clustering_budget import ClusteringBudget
+from src.invariants import INVARIANTS
+from src.clustering import (
+    cluster_reactions,
+    group_after_invariant,
+    cluster_after_invariant_grouping,
+)
+
+logger = logging.getLogger(__name__)
+
+# Invariants whose equality is necessary for isomorphism. algebraic_connectivity is a float compared with ==
+# and the Weisfeiler-Lehman clusterings never run an exact check, so they cannot give exact classes.
+EXACT_INVARIANTS = [
+    invariant for invariant in INVARIANTS if invariant != "algebraic_connectivity"
+]
+
+
+def choose_clustering_strategy(
+    list_reactions: List[Dict[Any, Any]],
+    sample_size: int = 200,
+    seed: Optional[int] = 0,
+    budget: Optional[ClusteringBudget] = None,
+) -> Dict[str, Any]:
+    """Chooses the fastest exact clustering pipeline from a sample of the reactions.
+
+    Every candidate (cluster_reactions alone, or group_after_invariant with one invariant followed by cluster_after_invariant_grouping) is timed on the sample. The runtime for the whole input is extrapolated with the sample scale and the measured growth of the number of groups and clusters, because both steps compare every reaction with every existing group or cluster.
+
+    With a budget the sample runs count against its time budget and use its step limit and cancellation token. A candidate whose sample run did not finish gets an infinite estimate, and once the budget is exhausted the remaining candidates are skipped. Sampled reactions are never added to budget.unverified.
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        sample_size (int): Number of sampled reactions. Defaults to 200
+        seed (Optional[int]): Seed for drawing the sample. Defaults to 0
+        budget (Optional[ClusteringBudget]): Time budget, VF2 step limit, progress callback and cancellation token. Progress is reported per estimated candidate. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: The chosen invariant (None for plain cluster_reactions), the estimated runtime in seconds (infinite if no candidate could be estimated), the estimates of all candidates and the reaction centre sizes of the sample (None for an empty input)
+    """
+    if budget is not None:
+        budget.start()
+
+    if not list_reactions:
+        logger.info("Chosen: cluster_reactions, empty input")
+        return {
+            "invariant": None,
+            "estimated_runtime": 0.0,
+            "candidates": {},
+            "reaction_centre_sizes": None,
+        }
+
+    positions = sorted(
+        random.Random(seed).sample(
+            range(len(list_reactions)), min(sample_size, len(list_reactions))
+        )
+    )
+    sample = [list_reactions[position] for position in positions]
+    scale = len(list_reactions) / len(sample)
+
+    centre_sizes = np.array(
+        [get_rc_updated(reaction["ITS"]).number_of_nodes() for reaction in sample]
+    )
+
+    candidates: Dict[str, Dict[str, float]] = {}
+    for number, invariant in enumerate([None] + EXACT_INVARIANTS):
+        if budget is not None and budget.exhausted():
+            break
+        candidates[invariant or "none"] = _estimate_candidate(
+            sample, invariant, scale, budget
+        )
+        if budget is not None:
+            budget.report_progress(
+                "choose_clustering_strategy", number + 1, len(EXACT_INVARIANTS) + 1
+            )
+
+    # Without any estimate (budget exhausted) fall back to plain cluster_reactions
+    best = min(
+        candidates,
+        key=lambda name: candidates[name]["estimated_runtime"],
+        default="none",
+    )
+    decision = {
+        "invariant": None if best == "none" else best,
+        "estimated_runtime": (
+            candidates[best]["estimated_runtime"] if candidates else math.inf
+        ),
+        "candidates": candidates,
+        "reaction_centre_sizes": {
+            "mean": float(centre_sizes.mean()),
+            "median": float(np.median(centre_sizes)),
+            "max": int(centre_sizes.max()),
+        },
+    }
+
+    logger.info(
+        "Sample of %d reactions, reaction centre size mean %.1f, max %d",
+        len(sample),
+        decision["reaction_centre_sizes"]["mean"],
+        decision["reaction_centre_sizes"]["max"],
+    )
+    for name, candidate in candidates.items():
+        logger.info(
+            "Candidate %s: %d groups in sample, estimated %.1f s",
+            name,
+            candidate["sample_groups"],
+            candidate["estimated_runtime"],
+        )
+    if not candidates:
+        logger.info("No candidate estimated, budget exhausted (%s)", budget.stop_reason)
+    logger.info(
+        "Chosen: %s, estimated runtime %.1f s",
+        (
+            "cluster_reactions"
+            if decision["invariant"] is None
+            else f"group_after_invariant({decision['invariant']}) + cluster_after_invariant_grouping"
+        ),
+        decision["estimated_runtime"],
+    )
+
+    return decision
+
+
+def cluster_auto(
+    list_reactions: List[Dict[Any, Any]],
+    sample_size: int = 200,
+    seed: Optional[int] = 0,
+    budget: Optional[ClusteringBudget] = None,
+) -> Dict[str, Any]:
+    """Clusters chemical reactions with the pipeline chosen by choose_clustering_strategy. The result is exact in the sense of cluster_reactions.
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        sample_size (int): Number of sampled reactions for the cost model. Defaults to 200
+        seed (Optional[int]): Seed for drawing the sample. Defaults to 0
+        budget (Optional[ClusteringBudget]): Shared by the strategy choice and the chosen pipeline. Reactions which could not be verified end up in budget.unverified. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
+    """
+    decision = choose_clustering_strategy(list_reactions, sample_size, seed, budget)
+
+    if decision["invariant"] is None:
+        return cluster_reactions(list_reactions, budget=budget)
+
+    nested_dict = cluster_after_invariant_grouping(
+        group_after_invariant(
+            list_reactions, invariant=decision["invariant"], budget=budget
+        ),
+        budget=budget,
+    )
+    cluster_dict = {}
+    for clusters in nested_dict.values():
+        for values in clusters.values():
+            cluster_dict[f"cluster_{len(cluster_dict)}"] = values
+
+    return cluster_dict
+
+
+def _estimate_candidate(
+    sample: List[Dict[Any, Any]],
+    invariant: Optional[str],
+    scale: float,
+    budget: Optional[ClusteringBudget] = None,
+) -> Dict[str, float]:
+    half = len(sample) // 2
+    sample_positions = {id(reaction): idx for idx, reaction in enumerate(sample)}
+
+    # A separate budget, so the sampled reactions do not end up in budget.unverified
+    sample_budget = None
+    if budget is not None:
+        sample_budget = ClusteringBudget(
+            time_budget=budget.remaining_time(),
+            max_isomorphism_steps=budget.max_isomorphism_steps,
+            cancellation_token=budget.cancellation_token,
+        )
+
+    grouping_time = 0.0
+    if invariant is None:
+        groups = {"group_0": sample}
+    else:
+        start = time.perf_counter()
+        groups = group_after_invariant(
+            sample, invariant=invariant, budget=sample_budget
+        )
+        grouping_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    nested_dict = cluster_after_invariant_grouping(groups, budget=sample_budget)
+    clustering_time = time.perf_counter() - start
+    clusters = [values for inner in nested_dict.values() for values in inner.values()]
+
+    if sample_budget is not None and (
+        sample_budget.stop_reason is not None or sample_budget.unverified
+    ):
+        # The run did not finish, the timings say nothing about the whole input
+        return {
+            "sample_groups": len(groups),
+            "sample_clusters": len(clusters),
+            "sample_runtime": grouping_time + clustering_time,
+            "estimated_runtime": math.inf,
+        }
+
+    # Groups and clusters are keyed by first appearance, the first member tells if it already existed in the first half
+    groups_growth = _growth_exponent(
+        len(groups),
+        sum(sample_positions[id(values[0])] < half for values in groups.values()),
+    )
+    clusters_growth = _growth_exponent(
+        len(clusters),
+        sum(sample_positions[id(values[0])] < half for values in clusters),
+    )
+
+    return {
+        "sample_groups": len(groups),
+        "sample_clusters": len(clusters),
+        "sample_runtime": grouping_time + clustering_time,
+        "estimated_runtime": grouping_time * scale ** (1 + groups_growth)
+        + clustering_time * scale ** (1 + clusters_growth),
+    }
+
+
+def _growth_exponent(count: int, count_first_half: int) -> float:
+    """Exponent a with count ~ n^a, from the counts in the first half and the whole sample. Clamped to [0, 1]."""
+    if count_first_half < 1:
+        return 1.0
+    return min(max(math.log2(count / count_first_half), 0.0), 1.0)
@@ -0,0 +1,136 @@
+from typing import Any, Dict, Iterable, Sequence, Union
+import hashlib
+import math
+import numpy as np
+
+from src.rc_extract import get_rc_updated
+from src.invariants import INVARIANTS, compute_invariant
+from src.reaction_signatures import reaction_centre_wl_hash
+
+
+class HyperLogLog:
+    """HyperLogLog sketch for estimating the number of distinct values in fixed memory (2^precision bytes).
+
+    Args:
+        precision (int): Number of index bits, between 4 and 18. The relative error is about 1.04 / sqrt(2^precision). Defaults to 12
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value: Union[str, bytes]) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        hashed = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        # Position of the leftmost 1 bit in the remaining 64 - precision bits
+        rank = 64 - self.precision - remainder.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Returns a new sketch of the union of both inputs. Merging is associative and commutative."""
+        if other.precision != self.precision:
+            raise ValueError("Only sketches with the same precision can be merged")
+        merged = HyperLogLog(self.precision)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        match m:
+            case 16:
+                alpha = 0.673
+            case 32:
+                alpha = 0.697
+            case 64:
+                alpha = 0.709
+            case _:
+                alpha = 0.7213 / (1 + 1.079 / m)
+
+        raw_estimate = (
+            alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        )
+        zero_registers = int(np.count_nonzero(self.registers == 0))
+
+        # Linear counting is more accurate for small cardinalities
+        if raw_estimate <= 2.5 * m and zero_registers:
+            return m * math.log(m / zero_registers)
+        return float(raw_estimate)
+
+
+def sketch_distinct_classes(
+    reactions: Iterable[Dict[Any, Any]],
+    signature_types: Sequence[str] = (
+        "weisfeiler_lehman",
+        "weisfeiler_lehman_attr",
+        "vertex_degrees",
+    ),
+    iterations: Sequence[int] = (1, 2, 3),
+    precision: int = 12,
+) -> Dict[str, HyperLogLog]:
+    """Streams once over the reactions and feeds the reaction centre signatures into one HyperLogLog sketch per signature type (and per iteration count for the Weisfeiler-Lehman types).
+
+    Args:
+        reactions (Iterable[Dict[Any, Any]]): The reactions, consumed once
+        signature_types (Sequence[str]): "weisfeiler_lehman", "weisfeiler_lehman_attr" or invariant names of group_after_invariant
+        iterations (Sequence[int]): Iteration counts for the Weisfeiler-Lehman types. Defaults to (1, 2, 3)
+        precision (int): Precision of the sketches. Defaults to 12
+
+    Returns:
+        Dict[str, HyperLogLog]: Sketches keyed by signature type, e.g. "weisfeiler_lehman_attr@3" or "vertex_degrees"
+    """
+    sketches: Dict[str, HyperLogLog] = {}
+    for signature_type in signature_types:
+        if signature_type in ("weisfeiler_lehman", "weisfeiler_lehman_attr"):
+            for iteration in iterations:
+                sketches[f"{signature_type}@{iteration}"] = HyperLogLog(precision)
+        else:
+            if signature_type not in INVARIANTS:
+                raise ValueError("Not a valid signature type")
+            sketches[signature_type] = HyperLogLog(precision)
+
+    for reaction in reactions:
+        reaction_centre = get_rc_updated(reaction["ITS"])
+        for key, sketch in sketches.items():
+            signature_type, _, iteration = key.partition("@")
+            if iteration:
+                sketch.add(
+                    reaction_centre_wl_hash(
+                        reaction,
+                        iterations=int(iteration),
+                        use_edge_node_attr=signature_type == "weisfeiler_lehman_attr",
+                    )
+                )
+            else:
+                sketch.add(repr(compute_invariant(reaction_centre, signature_type)))
+
+    return sketches
+
+
+def merge_sketches(*sketch_dicts: Dict[str, HyperLogLog]) -> Dict[str, HyperLogLog]:
+    """Merges the results of sketch_distinct_classes from several shards. Only keys present in all inputs are kept."""
+    if not sketch_dicts:
+        return {}
+
+    keys = set(sketch_dicts[0]).intersection(*sketch_dicts[1:])
+    merged = {}
+    for key in sorted(keys):
+        sketch = sketch_dicts[0][key]
+        for other in sketch_dicts[1:]:
+            sketch = sketch.merge(other[key])
+        merged[key] = sketch
+    return merged
+
+
+def estimate_distinct_classes(
+    sketches: Dict[str, HyperLogLog],
+) -> Dict[str, float]:
+    """Returns the estimated number of distinct classes per signature type."""
+    return {key: sketch.estimate() for key, sketch in sketches.items()}
@@ -0,0 +1,116 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import time
+
+from src.rc_extract import get_rc_updated
+from src.invariants import INVARIANTS, compute_invariant
+from src.reaction_signatures import reaction_centre_wl_hash
+from src.clustering import cluster_reactions
+from src.clustering_budget import ClusteringBudget
+
+Stage = Union[str, Tuple[str, Callable[[Dict[Any, Any]], Hashable]]]
+
+DEFAULT_STAGES: List[Stage] = [
+    "vertex_counts",
+    "edge_counts",
+    "vertex_degrees",
+    "weisfeiler_lehman",
+    "exact",
+]
+
+
+def cluster_cascade(
+    list_reactions: List[Dict[Any, Any]],
+    stages: Sequence[Stage] = DEFAULT_STAGES,
+    budget: Optional[ClusteringBudget] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Clusters chemical reactions with an ordered list of refinement stages. Every stage only splits the buckets of the previous stage which still have more than one member.
+
+    A stage is either a name or a (name, key function) pair. Key functions take a reaction and return a hashable key; reactions with equal keys stay together. Supported names:
+        - the invariants of group_after_invariant ("vertex_counts", "edge_counts", "vertex_degrees", "algebraic_connectivity", "rank")
+        - "weisfeiler_lehman": Weisfeiler-Lehman hash of the plain reaction centre structure
+        - "weisfeiler_lehman_attr": Weisfeiler-Lehman hash with element, charge and order. Stricter than cluster_reactions, which checks the attributes separately
+        - "exact": cluster_reactions inside each bucket
+
+    With "exact" as last stage and only invariants which isomorphic reaction centres share, the result has the same clusters as cluster_reactions.
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        stages (Sequence[Stage]): The stages in order. Defaults to DEFAULT_STAGES
+        budget (Optional[ClusteringBudget]): Passed on to cluster_reactions in the "exact" stage. Defaults to None.
+
+    Returns:
+        Tuple[Dict[str, Any], List[Dict[str, Any]]]: The flat cluster dict (keys are the number of the cluster, values are the reactions) and per stage the name, time in seconds, number of buckets checked, number of buckets split and number of buckets afterwards
+    """
+    stage_functions = [_stage_function(stage) for stage in stages]
+
+    buckets = [list(list_reactions)] if list_reactions else []
+    statistics = []
+
+    for name, split in stage_functions:
+        start = time.perf_counter()
+        refined_buckets = []
+        buckets_checked = 0
+        buckets_split = 0
+
+        for bucket in buckets:
+            if len(bucket) < 2:
+                refined_buckets.append(bucket)
+                continue
+
+            parts = split(bucket, budget)
+            buckets_checked += 1
+            if len(parts) > 1:
+                buckets_split += 1
+            refined_buckets.extend(parts)
+
+        buckets = refined_buckets
+        statistics.append(
+            {
+                "stage": name,
+                "time": time.perf_counter() - start,
+                "buckets_checked": buckets_checked,
+                "buckets_split": buckets_split,
+                "buckets": len(buckets),
+            }
+        )
+
+    cluster_dict = {f"cluster_{idx}": bucket for idx, bucket in enumerate(buckets)}
+    return cluster_dict, statistics
+
+
+def _stage_function(stage: Stage):
+    """Returns the stage name and a function splitting one bucket into parts."""
+    if not isinstance(stage, str):
+        name, key_function = stage
+        return name, lambda bucket, budget: _split_by_key(bucket, key_function)
+
+    if stage == "exact":
+        return stage, lambda bucket, budget: list(
+            cluster_reactions(bucket, budget=budget).values()
+        )
+
+    if stage in ("weisfeiler_lehman", "weisfeiler_lehman_attr"):
+        use_edge_node_attr = stage == "weisfeiler_lehman_attr"
+        return stage, lambda bucket, budget: _split_by_key(
+            bucket,
+            lambda reaction: reaction_centre_wl_hash(
+                reaction, use_edge_node_attr=use_edge_node_attr
+            ),
+        )
+
+    if stage not in INVARIANTS:
+        raise ValueError("Not a valid stage")
+
+    return stage, lambda bucket, budget: _split_by_key(
+        bucket,
+        lambda reaction: compute_invariant(get_rc_updated(reaction["ITS"]), stage),
+    )
+
+
+def _split_by_key(
+    bucket: List[Dict[Any, Any]], key_function: Callable[[Dict[Any, Any]], Hashable]
+) -> List[List[Dict[Any, Any]]]:
+    parts: Dict[Hashable, List[Dict[Any, Any]]] = {}
+    for reaction in bucket:
+        parts.setdefault(key_function(reaction), []).append(reaction)
+    return list(parts.values())
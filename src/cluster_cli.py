@@ -0,0 +1,233 @@
+"""Command-line entry point for streaming Weisfeiler-Lehman clustering.
+
+Usage:
+    python -m src.cluster_cli data/ITS_graphs.pkl.gz clusters.tsv --workers 4
+
+Reactions are read in chunks, the reaction centre signatures are computed (optionally in worker processes) and one line per reaction is appended to the output file. Only the signature -> cluster table and the cluster representatives are kept in memory.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import argparse
+import logging
+import pickle
+import sys
+import time
+
+from src.rc_extract import get_rc_updated
+from src.clustering_budget import ClusteringBudget
+from src.reaction_signatures import reaction_centre_wl_hash
+from src.reaction_stream import iter_chunks, iter_reactions
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_signatures(
+    chunk: List[Dict[Any, Any]], iterations: int, use_edge_node_attr: bool
+) -> List[str]:
+    """Computes the reaction centre signature for every reaction of a chunk. Module level, so it can be sent to worker processes."""
+    return [
+        reaction_centre_wl_hash(
+            reaction, iterations=iterations, use_edge_node_attr=use_edge_node_attr
+        )
+        for reaction in chunk
+    ]
+
+
+def stream_cluster(
+    input_path: str,
+    output_path: str,
+    chunk_size: int = 1000,
+    workers: int = 1,
+    iterations: int = 3,
+    use_edge_node_attr: bool = True,
+    budget: Optional[ClusteringBudget] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Clusters the reactions of input_path by reaction centre signature and writes the assignments to output_path while reading.
+
+    The output is a tab separated file with the columns index, cluster and signature. Cluster keys are given in order of first appearance, like in cluster_weisfeiler_lehman_nx.
+
+    With a budget, the time budget and the cancellation token are checked before every chunk is computed or submitted to a worker and while waiting for worker results, and progress is reported after every chunk (the total is None, the input length is unknown). When the budget is exhausted, reading stops, queued chunks are cancelled and the output file ends with the last finished chunk. The remaining reactions are never read, so they are not added to budget.unverified, check budget.stop_reason instead.
+
+    Args:
+        input_path (str): Pickle file with the reactions, see iter_reactions
+        output_path (str): Path of the tab separated output file
+        chunk_size (int): Number of reactions per chunk. Defaults to 1000
+        workers (int): Number of worker processes for computing signatures. Defaults to 1 (no worker processes)
+        iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to True.
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Defaults to None.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Keys are the signatures. Values hold the cluster key, the index and reaction centre of the representative and the cluster size.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    representatives: Dict[str, Dict[str, Any]] = {}
+    chunks = iter_chunks(iter_reactions(input_path), chunk_size)
+    processed = 0
+    start = time.perf_counter()
+    if budget is not None:
+        budget.start()
+
+    with open(output_path, "w") as output:
+        output.write("index\tcluster\tsignature\n")
+
+        for chunk, signatures in _signature_chunks(
+            chunks, workers, iterations, use_edge_node_attr, budget
+        ):
+            for offset, (reaction, signature) in enumerate(zip(chunk, signatures)):
+                index = processed + offset
+                entry = representatives.get(signature)
+
+                if entry is None:
+                    # Only the reaction centre is kept, never the whole ITS graph
+                    entry = {
+                        "cluster": f"cluster_{len(representatives)}",
+                        "index": index,
+                        "reaction_centre": get_rc_updated(reaction["ITS"]).copy(),
+                        "size": 0,
+                    }
+                    representatives[signature] = entry
+
+                entry["size"] += 1
+                output.write(f"{index}\t{entry['cluster']}\t{signature}\n")
+
+            processed += len(chunk)
+            output.flush()
+            logger.info(
+                "%d reactions processed, %d clusters, %.1f reactions/s",
+                processed,
+                len(representatives),
+                processed / max(time.perf_counter() - start, 1e-9),
+            )
+            if budget is not None:
+                budget.report_progress("stream_cluster", processed, None)
+
+    if budget is not None and budget.stop_reason is not None:
+        logger.warning("Stopped after %d reactions (%s)", processed, budget.stop_reason)
+
+    return representatives
+
+
+def _signature_chunks(
+    chunks,
+    workers: int,
+    iterations: int,
+    use_edge_node_attr: bool,
+    budget: Optional[ClusteringBudget] = None,
+):
+    """Yields (chunk, signatures) pairs in input order. With worker processes at most 2 * workers chunks are in flight, so the input is never read ahead further than that.
+
+    The budget is checked before every chunk is computed or submitted and while waiting for a result. Once it is exhausted nothing more is yielded, queued chunks are cancelled and running ones are not waited for.
+    """
+    if workers == 1:
+        for chunk in chunks:
+            if budget is not None and budget.exhausted():
+                return
+            yield chunk, chunk_signatures(chunk, iterations, use_edge_node_attr)
+        return
+
+    in_flight: deque[Tuple[List[Dict[Any, Any]], Future]] = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk in chunks:
+            if budget is not None and budget.exhausted():
+                return
+            in_flight.append(
+                (
+                    chunk,
+                    executor.submit(
+                        chunk_signatures, chunk, iterations, use_edge_node_attr
+                    ),
+                )
+            )
+            if len(in_flight) >= 2 * workers:
+                chunk, future = in_flight.popleft()
+                signatures = _wait_for_result(future, budget)
+                if signatures is None:
+                    return
+                yield chunk, signatures
+
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            signatures = _wait_for_result(future, budget)
+            if signatures is None:
+                return
+            yield chunk, signatures
+    finally:
+        # Also runs when the consumer stops early, so a cancelled run does not wait for the queued chunks
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _wait_for_result(
+    future: Future, budget: Optional[ClusteringBudget], poll_interval: float = 0.1
+) -> Optional[List[str]]:
+    """Returns the result of future, or None if the budget is exhausted first."""
+    if budget is None:
+        return future.result()
+    while True:
+        if budget.exhausted():
+            return None
+        try:
+            return future.result(timeout=poll_interval)
+        except FuturesTimeoutError:
+            continue
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Cluster reactions by the Weisfeiler-Lehman hash of their reaction centre."
+    )
+    parser.add_argument("input", help="pickle file with the reactions")
+    parser.add_argument("output", help="tab separated output file")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument(
+        "--no-attributes",
+        action="store_true",
+        help="hash the plain graph structure without element, charge and order",
+    )
+    parser.add_argument(
+        "--representatives",
+        help="optional pickle file for the cluster representatives",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="stop after this many seconds, the output then ends with the last finished chunk",
+    )
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format="%(asctime)s %(message)s",
+        stream=sys.stderr,
+    )
+
+    budget = ClusteringBudget(time_budget=args.time_budget)
+    representatives = stream_cluster(
+        args.input,
+        args.output,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        iterations=args.iterations,
+        use_edge_node_attr=not args.no_attributes,
+        budget=budget,
+    )
+
+    if args.representatives:
+        with open(args.representatives, "wb") as file:
+            pickle.dump(representatives, file)
+
+    logger.info("%d clusters written to %s", len(representatives), args.output)
+    return 0 if budget.stop_reason is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
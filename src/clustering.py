@@ -1,10 +1,11 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import networkx as nx
 import networkx.algorithms.isomorphism as iso
 
 
 from src.rc_extract import get_rc_updated
 from src.invariants import (
+    INVARIANTS,
     edge_count_invariant,
     vertex_degree_invariant,
     vertex_count_invariant,
@@ -15,13 +16,18 @@ from src.invariants import (
 )
 from src.add_combined_node_attributes import combine_charge_element_to_node
 from src.weisfeiler_lehman_si import weisfeiler_lehman_isomorhpic_test, SharedHashTable
+from src.clustering_budget import ClusteringBudget, bounded_is_isomorphic
 
 
-def cluster_reactions(list_reactions: List[Dict[Any, Any]]) -> Dict[str, Any]:
+def cluster_reactions(
+    list_reactions: List[Dict[Any, Any]],
+    budget: Optional[ClusteringBudget] = None,
+) -> Dict[str, Any]:
     """Simple function for clusterting chemical reactions
 
     Args:
         list_reactions (List[Dict[Any, Any]]): A list of reactions
+        budget (Optional[ClusteringBudget]): Time budget, VF2 step limit, progress callback and cancellation token. Reactions which could not be verified end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
@@ -32,6 +38,10 @@ def cluster_reactions(list_reactions: List[Dict[Any, Any]]) -> Dict[str, Any]:
     nm_element = iso.categorical_node_match("element", "C")
     em_order = iso.categorical_edge_match("order", 0)
 
+    max_steps = budget.max_isomorphism_steps if budget is not None else None
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction clusters and cluster counter for key naming
     cluster_dict = {}
     cluster_counter = 0
@@ -39,6 +49,9 @@ def cluster_reactions(list_reactions: List[Dict[Any, Any]]) -> Dict[str, Any]:
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_centre = get_rc_updated(reaction["ITS"])
 
             # Create first entry in dict. For the first reaction there is nothing to compare
@@ -48,58 +61,103 @@ def cluster_reactions(list_reactions: List[Dict[Any, Any]]) -> Dict[str, Any]:
 
             else:
                 # Checks if isomorphs of the reaction centre already exist in a cluster
+                undecided = False
                 for key, value in cluster_dict.items():
                     cluster_centre = get_rc_updated(value[0]["ITS"])
 
                     # TODO Maybe this could be optimized... and I do not know if it is correct -.-'
                     # Only need to be checked once
-                    if (
-                        nx.is_isomorphic(
-                            cluster_centre, reaction_centre, node_match=nm_charge
-                        )
-                        and nx.is_isomorphic(
-                            cluster_centre, reaction_centre, node_match=nm_element
-                        )
-                        and nx.is_isomorphic(
-                            cluster_centre, reaction_centre, edge_match=em_order
-                        )
-                    ):
+                    is_isomorphic = _reaction_centres_isomorphic(
+                        cluster_centre,
+                        reaction_centre,
+                        [
+                            {"node_match": nm_charge},
+                            {"node_match": nm_element},
+                            {"edge_match": em_order},
+                        ],
+                        max_steps,
+                    )
+
+                    # Step limit reached: a later cluster may still match for sure
+                    if is_isomorphic is None:
+                        undecided = True
+                        continue
+
+                    if is_isomorphic:
                         value.append(reaction)
                         cluster_dict[key] = value
                         break
 
                 else:
-                    # If no isomorphic reaction centre can be found, create a new entry (cluster)
-                    cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
-                    cluster_counter += 1
+                    if undecided:
+                        # No definite match, but an undecided one: neither merge nor open a new cluster
+                        budget.unverified.append(reaction)
+                    else:
+                        # If no isomorphic reaction centre can be found, create a new entry (cluster)
+                        cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
+                        cluster_counter += 1
+
+            if budget is not None:
+                budget.report_progress(
+                    "cluster_reactions", idx + 1, len(list_reactions)
+                )
 
     return cluster_dict
 
 
+def _reaction_centres_isomorphic(
+    cluster_centre: nx.Graph,
+    reaction_centre: nx.Graph,
+    matchers: List[Dict[str, Any]],
+    max_steps: Optional[int],
+) -> Optional[bool]:
+    """Runs one isomorphism check per matcher. False as soon as one check fails, None if a check was undecided because of the step limit."""
+    undecided = False
+    for matcher in matchers:
+        result = bounded_is_isomorphic(
+            cluster_centre, reaction_centre, max_steps=max_steps, **matcher
+        )
+        if result is False:
+            return False
+        if result is None:
+            undecided = True
+
+    return None if undecided else True
+
+
+def _stop_clustering(
+    budget: Optional[ClusteringBudget], list_reactions: List[Dict[Any, Any]], idx: int
+) -> bool:
+    """Checks the budget before reaction idx. If it is exhausted, this and all following reactions are unverified."""
+    if budget is None or not budget.exhausted():
+        return False
+
+    budget.unverified.extend(list_reactions[idx:])
+    return True
+
+
 def group_after_invariant(
-    list_reactions: List[Dict[Any, Any]], invariant: str
+    list_reactions: List[Dict[Any, Any]],
+    invariant: str,
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Any]:
     """Simple function for grouping chemical reactions
 
     Args:
         list_reactions (List[Dict[Any, Any]]): A list of reactions
         invariant (str): Select invariant for clusterting
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Reactions which could not be processed end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the groups. Values are the isomorphic reactions.
     """
 
-    invariants = [
-        "vertex_counts",
-        "edge_counts",
-        "vertex_degrees",
-        "algebraic_connectivity",
-        "rank",
-    ]
-
-    if invariant not in invariants:
+    if invariant not in INVARIANTS:
         raise ValueError("Not a valid invariant")
 
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction groups and groups counter for key naming
     group_dict = {}
     group_counter = 0
@@ -107,6 +165,9 @@ def group_after_invariant(
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_centre = get_rc_updated(reaction["ITS"])
 
             # Create first entry in dict. For the first reaction there is nothing to compare
@@ -183,16 +244,23 @@ def group_after_invariant(
                     group_dict[f"group_{group_counter}"] = [reaction]
                     group_counter += 1
 
+            if budget is not None:
+                budget.report_progress(
+                    "group_after_invariant", idx + 1, len(list_reactions)
+                )
+
     return group_dict
 
 
 def cluster_after_invariant_grouping(
     group_dict: Dict[str, Any],
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Dict[str, Any]]:
     """Function for clustering after grouping. The result dict of group_after_invariant() is clustered using isomorphism check.
 
     Args:
     group_dict Dict[str, Any]: The result dict of group_after_invariant()
+    budget (Optional[ClusteringBudget]): Passed on to cluster_reactions for every group. Progress is additionally reported per finished group. Defaults to None.
 
     Returns:
         Dict[Dict[str, Any]]: Returns a dicts in a dict. Outer dicts keys are the groups number. In this group, the keys of the inner dicts are the cluster numbers.
@@ -202,10 +270,17 @@ def cluster_after_invariant_grouping(
     if not group_dict:
         return cluster_after_group_dict
 
+    total = sum(len(values) for values in group_dict.values())
+    done = 0
+
     for key, values in group_dict.items():
-        temporary_cluster_dict = cluster_reactions(values)
+        temporary_cluster_dict = cluster_reactions(values, budget=budget)
         cluster_after_group_dict[key] = temporary_cluster_dict
 
+        if budget is not None:
+            done += len(values)
+            budget.report_progress("cluster_after_invariant_grouping", done, total)
+
     return cluster_after_group_dict
 
 
@@ -213,6 +288,7 @@ def cluster_weisfeiler_lehman_nx(
     list_reactions: List[Dict[Any, Any]],
     iterations: int = 3,
     use_edge_node_attr: bool = False,
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Any]:
     """Simple function for clusterting chemical reactions using Weisfeiler-Lehman from NetworkX
 
@@ -220,11 +296,15 @@ def cluster_weisfeiler_lehman_nx(
         list_reactions (List[Dict[Any, Any]]): A list of reactions
         iterations (int): Number of neighbor aggregations to perform. Defaults to 3
         use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to False.
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Reactions which could not be processed end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
     """
 
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction clusters and cluster counter for key naming
     cluster_dict = {}
     cluster_counter = 0
@@ -232,6 +312,9 @@ def cluster_weisfeiler_lehman_nx(
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_centre = get_rc_updated(reaction["ITS"])
 
             if use_edge_node_attr:
@@ -268,6 +351,7 @@ def cluster_weisfeiler_lehman_nx(
 
             else:
                 # Checks if isomorphs of the reaction centre already exist in a cluster
+                undecided = False
                 for key, value in cluster_dict.items():
                     cluster_centre = get_rc_updated(value[0]["ITS"])
 
@@ -300,6 +384,11 @@ def cluster_weisfeiler_lehman_nx(
                     cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
                     cluster_counter += 1
 
+            if budget is not None:
+                budget.report_progress(
+                    "cluster_weisfeiler_lehman_nx", idx + 1, len(list_reactions)
+                )
+
     return cluster_dict
 
 
@@ -307,6 +396,7 @@ def cluster_weisfeiler_lehman_si(
     list_reactions: List[Dict[Any, Any]],
     extract_reaction_centre: bool = True,
     reset: bool = True,
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Any]:
     """Simple function for clusterting chemical reactions using Weisfeiler-Lehman from NetworkX
 
@@ -314,11 +404,15 @@ def cluster_weisfeiler_lehman_si(
         list_reactions (List[Dict[Any, Any]]): A list of reactions
         iterations (int): Number of neighbor aggregations to perform. Defaults to 3
         use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to False.
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Reactions which could not be processed end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
     """
 
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction clusters and cluster counter for key naming
     cluster_dict = {}
     cluster_counter = 0
@@ -326,6 +420,9 @@ def cluster_weisfeiler_lehman_si(
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_centre = get_rc_updated(reaction["ITS"])
 
             # Create first entry in dict. For the first reaction there is nothing to compare
@@ -335,6 +432,7 @@ def cluster_weisfeiler_lehman_si(
 
             else:
                 # Checks if isomorphs of the reaction centre already exist in a cluster
+                undecided = False
                 for key, value in cluster_dict.items():
                     cluster_centre = get_rc_updated(value[0]["ITS"])
 
@@ -358,21 +456,31 @@ def cluster_weisfeiler_lehman_si(
                     cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
                     cluster_counter += 1
 
+            if budget is not None:
+                budget.report_progress(
+                    "cluster_weisfeiler_lehman_si", idx + 1, len(list_reactions)
+                )
+
     return cluster_dict
 
 
 def cluster_histograms(
     list_reactions: List[Dict[Any, Any]],
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Any]:
     """Simple function for clusterting chemical reactions using Weisfeiler-Lehman histograms
     Args:
         list_reactions (List[Dict[Any, Any]]): A list of reactions
         iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Reactions which could not be processed end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
     """
 
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction clusters and cluster counter for key naming
     cluster_dict = {}
     cluster_counter = 0
@@ -380,6 +488,9 @@ def cluster_histograms(
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_histogram = reaction["histogram"]
 
             # Create first entry in dict. For the first reaction there is nothing to compare
@@ -389,6 +500,7 @@ def cluster_histograms(
 
             else:
                 # Checks if isomorphs of the reaction centre already exist in a cluster
+                undecided = False
                 for key, value in cluster_dict.items():
                     cluster_histogram = value[0]["histogram"]
 
@@ -405,23 +517,32 @@ def cluster_histograms(
                     cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
                     cluster_counter += 1
 
+            if budget is not None:
+                budget.report_progress(
+                    "cluster_histograms", idx + 1, len(list_reactions)
+                )
+
     return cluster_dict
 
 
 def cluster_compressed_labels(
     list_reactions: List[Dict[Any, Any]],
+    budget: Optional[ClusteringBudget] = None,
 ) -> Dict[str, Any]:
     """Simple function for clusterting chemical reactions using Weisfeiler-Lehmans compressed labels
 
     Args:
         list_reactions (List[Dict[Any, Any]]): A list of reactions
         iterations (int): Number of neighbor aggregations to perform. Defaults to 3
-
+        budget (Optional[ClusteringBudget]): Time budget, progress callback and cancellation token. Reactions which could not be processed end up in budget.unverified. Defaults to None.
 
     Returns:
         Dict[str, Any]: Returns a dict. Keys are the number of the cluster. Values are the isomorphic reactions.
     """
 
+    if budget is not None:
+        budget.start()
+
     # Create an empty dict for storing reaction clusters and cluster counter for key naming
     cluster_dict = {}
     cluster_counter = 0
@@ -429,6 +550,9 @@ def cluster_compressed_labels(
     # Check if the list of reactions is empty
     if list_reactions:
         for idx, reaction in enumerate(list_reactions):
+            if _stop_clustering(budget, list_reactions, idx):
+                break
+
             reaction_histogram = reaction["compressed_labels"]
 
             # Create first entry in dict. For the first reaction there is nothing to compare
@@ -438,6 +562,7 @@ def cluster_compressed_labels(
 
             else:
                 # Checks if isomorphs of the reaction centre already exist in a cluster
+                undecided = False
                 for key, value in cluster_dict.items():
                     cluster_histogram = value[0]["compressed_labels"]
 
@@ -456,4 +581,9 @@ def cluster_compressed_labels(
                     cluster_dict[f"cluster_{cluster_counter}"] = [reaction]
                     cluster_counter += 1
 
+            if budget is not None:
+                budget.report_progress(
+                    "cluster_compressed_labels", idx + 1, len(list_reactions)
+                )
+
     return cluster_dict
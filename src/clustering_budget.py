@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+import networkx as nx
+import networkx.algorithms.isomorphism as iso
+
+
+class CancellationToken:
+    """Thread safe flag for stopping a running clustering from another thread (e.g. a signal handler or a UI)."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ClusteringBudget:
+    """Limits for one clustering run. Pass the same object to all functions of the run.
+
+    Reactions which could not be verified, because the time ran out, the run was cancelled or an isomorphism check hit the step limit, are neither added to an existing cluster nor used for a new one. They are collected in unverified instead.
+
+    Args:
+        time_budget (Optional[float]): Seconds for the whole run, counted from the first clustering call. Defaults to None (no limit)
+        max_isomorphism_steps (Optional[int]): Maximal number of VF2 candidate pairs per isomorphism check. Defaults to None (no limit)
+        progress_callback (Optional[Callable[[str, int, Optional[int]], None]]): Called with the function name, the number of processed reactions and the total number of reactions (None if unknown, e.g. while streaming)
+        cancellation_token (Optional[CancellationToken]): Token for stopping the run
+    """
+
+    def __init__(
+        self,
+        time_budget: Optional[float] = None,
+        max_isomorphism_steps: Optional[int] = None,
+        progress_callback: Optional[Callable[[str, int, Optional[int]], None]] = None,
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> None:
+        self.time_budget = time_budget
+        self.max_isomorphism_steps = max_isomorphism_steps
+        self.progress_callback = progress_callback
+        self.cancellation_token = cancellation_token
+        self.unverified: List[Dict[Any, Any]] = []
+        self.stop_reason: Optional[str] = None
+        self._deadline: Optional[float] = None
+        self._started = False
+
+    def start(self) -> None:
+        """Starts the clock. Only the first call counts, so nested clustering calls share the budget."""
+        if self._started:
+            return
+        self._started = True
+        if self.time_budget is not None:
+            self._deadline = time.monotonic() + self.time_budget
+
+    def exhausted(self) -> bool:
+        """Returns True if the run was cancelled or the time budget is used up."""
+        if self.stop_reason is not None:
+            return True
+        if self.cancellation_token is not None and self.cancellation_token.cancelled:
+            self.stop_reason = "cancelled"
+        elif self._deadline is not None and time.monotonic() >= self._deadline:
+            self.stop_reason = "time_budget"
+        return self.stop_reason is not None
+
+    def remaining_time(self) -> Optional[float]:
+        """Returns the seconds left of the time budget, or None if there is no time budget."""
+        if self.time_budget is None:
+            return None
+        if self._deadline is None:
+            return self.time_budget
+        return max(self._deadline - time.monotonic(), 0.0)
+
+    def report_progress(
+        self, function_name: str, done: int, total: Optional[int]
+    ) -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(function_name, done, total)
+
+
+class _StepLimitReached(Exception):
+    pass
+
+
+class _StepLimitedGraphMatcher(iso.GraphMatcher):
+    """GraphMatcher which gives up after max_steps candidate pairs."""
+
+    def __init__(self, G1, G2, max_steps: int, node_match=None, edge_match=None):
+        super().__init__(G1, G2, node_match=node_match, edge_match=edge_match)
+        self.max_steps = max_steps
+        self.steps = 0
+
+    def syntactic_feasibility(self, G1_node, G2_node):
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise _StepLimitReached
+        return super().syntactic_feasibility(G1_node, G2_node)
+
+
+def bounded_is_isomorphic(
+    graph_1: nx.Graph,
+    graph_2: nx.Graph,
+    node_match: Optional[Callable] = None,
+    edge_match: Optional[Callable] = None,
+    max_steps: Optional[int] = None,
+) -> Optional[bool]:
+    """Like nx.is_isomorphic, but the VF2 search is stopped after max_steps candidate pairs.
+
+    Returns:
+        Optional[bool]: True or False, or None if the step limit was reached before the search finished
+    """
+    if max_steps is None:
+        return nx.is_isomorphic(
+            graph_1, graph_2, node_match=node_match, edge_match=edge_match
+        )
+
+    graph_matcher = _StepLimitedGraphMatcher(
+        graph_1, graph_2, max_steps, node_match=node_match, edge_match=edge_match
+    )
+    try:
+        return graph_matcher.is_isomorphic()
+    except _StepLimitReached:
+        return None
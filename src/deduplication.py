@@ -0,0 +1,132 @@
+from typing import Any, Callable, Dict, List, Tuple
+import hashlib
+import networkx as nx
+
+
+def its_digest(graph: nx.Graph) -> str:
+    """Computes a digest of an ITS graph from its node ids, edges and the element, charge, order and standard_order attributes. Equal digests mean identical graphs, not only isomorphic ones.
+
+    Args:
+        graph (nx.Graph): The ITS graph
+
+    Returns:
+        str: Hex digest
+    """
+    nodes = sorted(
+        (
+            (node, data.get("element"), data.get("charge"))
+            for node, data in graph.nodes(data=True)
+        ),
+        key=repr,
+    )
+    edges = sorted(
+        (
+            (
+                *sorted((u, v), key=repr),
+                data.get("order"),
+                data.get("standard_order"),
+            )
+            for u, v, data in graph.edges(data=True)
+        ),
+        key=repr,
+    )
+    return hashlib.blake2b(repr((nodes, edges)).encode(), digest_size=16).hexdigest()
+
+
+def collapse_duplicates(
+    list_reactions: List[Dict[Any, Any]],
+) -> Tuple[List[Dict[Any, Any]], List[List[int]]]:
+    """Collapses reactions with identical ITS graphs into one representative (the first occurrence).
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+
+    Returns:
+        Tuple[List[Dict[Any, Any]], List[List[int]]]: The unique reactions in order of first occurrence and, for each of them, the positions of all its copies in list_reactions
+    """
+    unique_reactions: List[Dict[Any, Any]] = []
+    multiplicities: List[List[int]] = []
+    digest_to_unique: Dict[str, int] = {}
+
+    for idx, reaction in enumerate(list_reactions):
+        digest = its_digest(reaction["ITS"])
+        unique_idx = digest_to_unique.get(digest)
+
+        if unique_idx is None:
+            digest_to_unique[digest] = len(unique_reactions)
+            unique_reactions.append(reaction)
+            multiplicities.append([idx])
+        else:
+            multiplicities[unique_idx].append(idx)
+
+    return unique_reactions, multiplicities
+
+
+def expand_duplicates(
+    result: Any,
+    list_reactions: List[Dict[Any, Any]],
+    unique_reactions: List[Dict[Any, Any]],
+    multiplicities: List[List[int]],
+) -> Any:
+    """Replaces every unique reaction in a clustering result by all its copies. Works for the flat dicts of the cluster_* functions, the nested dict of cluster_after_invariant_grouping, plain lists of reactions and the (cluster_dict, statistics) tuple of cluster_cascade. The statistics are kept as they are and count the unique reactions.
+
+    Args:
+        result (Any): Clustering result of the unique reactions
+        list_reactions (List[Dict[Any, Any]]): The original list of reactions
+        unique_reactions (List[Dict[Any, Any]]): First return value of collapse_duplicates
+        multiplicities (List[List[int]]): Second return value of collapse_duplicates
+
+    Returns:
+        Any: The clustering result covering all reactions of list_reactions
+
+    Raises:
+        TypeError: If the result has none of the supported shapes
+    """
+    # Reactions are dicts and not hashable, so they are identified by object id
+    copies = {
+        id(reaction): [list_reactions[idx] for idx in positions]
+        for reaction, positions in zip(unique_reactions, multiplicities)
+    }
+
+    def expand(entry: Any) -> Any:
+        if isinstance(entry, dict):
+            return {key: expand(value) for key, value in entry.items()}
+        if not isinstance(entry, list) or any(
+            id(reaction) not in copies for reaction in entry
+        ):
+            raise TypeError("Not a supported clustering result")
+        return [copy for reaction in entry for copy in copies[id(reaction)]]
+
+    if isinstance(result, tuple):
+        if len(result) != 2 or not isinstance(result[0], dict):
+            raise TypeError("Not a supported clustering result")
+        cluster_dict, statistics = result
+        return expand(cluster_dict), statistics
+    return expand(result)
+
+
+def cluster_deduplicated(
+    list_reactions: List[Dict[Any, Any]],
+    cluster_function: Callable[..., Any],
+    **kwargs: Any,
+) -> Any:
+    """Collapses exact duplicates, clusters the unique reactions with cluster_function and expands the result again.
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        cluster_function (Callable[..., Any]): One of the cluster_* functions, e.g. cluster_reactions
+        **kwargs (Any): Passed on to cluster_function. If a budget is given, its unverified reactions are expanded as well
+
+    Returns:
+        Any: The result of cluster_function, covering all reactions of list_reactions
+    """
+    unique_reactions, multiplicities = collapse_duplicates(list_reactions)
+    result = cluster_function(unique_reactions, **kwargs)
+
+    budget = kwargs.get("budget")
+    if budget is not None and budget.unverified:
+        budget.unverified = expand_duplicates(
+            budget.unverified, list_reactions, unique_reactions, multiplicities
+        )
+
+    return expand_duplicates(result, list_reactions, unique_reactions, multiplicities)
@@ -0,0 +1,146 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import heapq
+import os
+import struct
+import tempfile
+
+from src.reaction_signatures import reaction_centre_wl_hash
+
+# 16 byte signature + 8 byte reaction index. Big endian, so sorting the raw records sorts by (signature, index)
+RECORD = struct.Struct(">16sQ")
+SIGNATURE_SIZE = 16
+
+
+def fixed_width_signature(
+    reaction: Dict[Any, Any], iterations: int = 3, use_edge_node_attr: bool = True
+) -> bytes:
+    """Computes a 16 byte signature of the reaction centre from its Weisfeiler-Lehman hash.
+
+    Args:
+        reaction (Dict[Any, Any]): A reaction with an "ITS" graph
+        iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to True.
+
+    Returns:
+        bytes: The signature
+    """
+    wl_hash = reaction_centre_wl_hash(
+        reaction, iterations=iterations, use_edge_node_attr=use_edge_node_attr
+    )
+    return hashlib.blake2b(wl_hash.encode(), digest_size=SIGNATURE_SIZE).digest()
+
+
+def group_external(
+    reactions: Iterable[Dict[Any, Any]],
+    run_size: int = 100_000,
+    max_open_runs: int = 64,
+    tmp_dir: Optional[str] = None,
+    iterations: int = 3,
+    use_edge_node_attr: bool = True,
+) -> Iterator[Tuple[str, List[int]]]:
+    """Groups reactions by reaction centre signature without keeping the reactions in memory (external merge sort).
+
+    (signature, index) records are collected until run_size records are buffered, then sorted and spilled to a run file. While there are more than max_open_runs runs, groups of max_open_runs runs are merged into longer intermediate runs. The remaining runs are k-way merged and every finished group is yielded. Open files and read buffers are bounded by max_open_runs, the sort buffer by run_size, so peak memory depends on these two and on the size of the largest group, not on the number of reactions. Pass iter_reactions(path) from src.reaction_stream to stream the reactions from disk.
+
+    Args:
+        reactions (Iterable[Dict[Any, Any]]): The reactions, consumed once
+        run_size (int): Number of records per sorted run. Defaults to 100000
+        max_open_runs (int): Maximal number of runs merged (and open) at the same time. Defaults to 64
+        tmp_dir (Optional[str]): Directory for the run files. Defaults to the system temporary directory
+        iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to True.
+
+    Returns:
+        Iterator[Tuple[str, List[int]]]: Pairs of hex signature and the sorted input positions of the group, in signature order
+    """
+    if run_size < 1:
+        raise ValueError("run_size must be at least 1")
+    if max_open_runs < 2:
+        raise ValueError("max_open_runs must be at least 2")
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+        run_paths: List[str] = []
+        buffer: List[bytes] = []
+
+        for idx, reaction in enumerate(reactions):
+            buffer.append(
+                RECORD.pack(
+                    fixed_width_signature(reaction, iterations, use_edge_node_attr), idx
+                )
+            )
+            if len(buffer) == run_size:
+                run_paths.append(_spill_run(buffer, run_dir, len(run_paths)))
+                buffer = []
+
+        # Everything fits into one run, no need to touch the disk
+        if not run_paths:
+            buffer.sort()
+            records: Iterator[bytes] = iter(buffer)
+        else:
+            if buffer:
+                run_paths.append(_spill_run(buffer, run_dir, len(run_paths)))
+            buffer = []
+            run_paths = _reduce_runs(run_paths, run_dir, max_open_runs)
+            records = heapq.merge(*(_read_run(path) for path in run_paths))
+
+        yield from _consecutive_groups(records)
+
+
+def _spill_run(buffer: List[bytes], run_dir: str, run_number: int) -> str:
+    path = os.path.join(run_dir, f"run_{run_number}.bin")
+    buffer.sort()
+    with open(path, "wb") as file:
+        file.write(b"".join(buffer))
+    return path
+
+
+def _reduce_runs(run_paths: List[str], run_dir: str, max_open_runs: int) -> List[str]:
+    """Merges runs in passes of at most max_open_runs runs until at most max_open_runs runs are left."""
+    merge_pass = 0
+    while len(run_paths) > max_open_runs:
+        merged_paths = []
+        for start in range(0, len(run_paths), max_open_runs):
+            group = run_paths[start : start + max_open_runs]
+            if len(group) == 1:
+                merged_paths.append(group[0])
+                continue
+
+            path = os.path.join(run_dir, f"merge_{merge_pass}_{len(merged_paths)}.bin")
+            with open(path, "wb") as file:
+                file.writelines(heapq.merge(*(_read_run(run) for run in group)))
+            for run in group:
+                os.remove(run)
+            merged_paths.append(path)
+
+        run_paths = merged_paths
+        merge_pass += 1
+
+    return run_paths
+
+
+def _read_run(path: str, records_per_read: int = 4096) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        while True:
+            block = file.read(RECORD.size * records_per_read)
+            if not block:
+                return
+            for offset in range(0, len(block), RECORD.size):
+                yield block[offset : offset + RECORD.size]
+
+
+def _consecutive_groups(records: Iterator[bytes]) -> Iterator[Tuple[str, List[int]]]:
+    current_signature = None
+    members: List[int] = []
+
+    for record in records:
+        signature, idx = RECORD.unpack(record)
+        if signature != current_signature:
+            if members:
+                yield current_signature.hex(), members
+            current_signature = signature
+            members = []
+        members.append(idx)
+
+    if members:
+        yield current_signature.hex(), members
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Sequence
+from collections import Counter
+import hashlib
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from src.rc_extract import get_rc_updated
+from src.invariants import compute_invariant
+from src.reaction_signatures import reaction_centre_wl_hash
+
+
+def _digest(value: Any) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(repr(value).encode(), digest_size=8).digest(), "little"
+    )
+
+
+def _element_charge_histogram(reaction_centre: nx.Graph) -> tuple:
+    return tuple(
+        sorted(
+            Counter(
+                (data.get("element"), data.get("charge"))
+                for _, data in reaction_centre.nodes(data=True)
+            ).items()
+        )
+    )
+
+
+def invariant_table(
+    list_reactions: List[Dict[Any, Any]], iterations: int = 3
+) -> pd.DataFrame:
+    """Computes all invariants of every reaction centre in one pass and returns them as a table with one row per reaction.
+
+    Columns: vertex_count, edge_count, rank (smallest unsigned integer type that fits), algebraic_connectivity (float32) and the 64 bit digests degree_sequence_digest, element_charge_digest, wl_hash and wl_hash_attr (Weisfeiler-Lehman hash without and with element, charge and order).
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        iterations (int): Number of neighbor aggregations for the Weisfeiler-Lehman hashes. Defaults to 3
+
+    Returns:
+        pd.DataFrame: The invariant table. The row position is the position in list_reactions
+    """
+    columns: Dict[str, List[Any]] = {
+        "vertex_count": [],
+        "edge_count": [],
+        "rank": [],
+        "algebraic_connectivity": [],
+        "degree_sequence_digest": [],
+        "element_charge_digest": [],
+        "wl_hash": [],
+        "wl_hash_attr": [],
+    }
+
+    for reaction in list_reactions:
+        reaction_centre = get_rc_updated(reaction["ITS"])
+
+        columns["vertex_count"].append(reaction_centre.number_of_nodes())
+        columns["edge_count"].append(reaction_centre.number_of_edges())
+        columns["rank"].append(compute_invariant(reaction_centre, "rank"))
+        columns["algebraic_connectivity"].append(
+            compute_invariant(reaction_centre, "algebraic_connectivity")
+        )
+        columns["degree_sequence_digest"].append(
+            _digest(compute_invariant(reaction_centre, "vertex_degrees"))
+        )
+        columns["element_charge_digest"].append(
+            _digest(_element_charge_histogram(reaction_centre))
+        )
+        # The hex hashes are 32 characters long, the first 16 fit into 64 bits
+        columns["wl_hash"].append(
+            int(
+                reaction_centre_wl_hash(
+                    reaction, iterations=iterations, use_edge_node_attr=False
+                )[:16],
+                16,
+            )
+        )
+        columns["wl_hash_attr"].append(
+            int(
+                reaction_centre_wl_hash(
+                    reaction, iterations=iterations, use_edge_node_attr=True
+                )[:16],
+                16,
+            )
+        )
+
+    table = pd.DataFrame(
+        {
+            "vertex_count": pd.to_numeric(
+                pd.Series(columns["vertex_count"], dtype=np.int64),
+                downcast="unsigned",
+            ),
+            "edge_count": pd.to_numeric(
+                pd.Series(columns["edge_count"], dtype=np.int64), downcast="unsigned"
+            ),
+            "rank": pd.to_numeric(
+                pd.Series(columns["rank"], dtype=np.int64), downcast="unsigned"
+            ),
+            "algebraic_connectivity": np.asarray(
+                columns["algebraic_connectivity"], dtype=np.float32
+            ),
+            "degree_sequence_digest": np.asarray(
+                columns["degree_sequence_digest"], dtype=np.uint64
+            ),
+            "element_charge_digest": np.asarray(
+                columns["element_charge_digest"], dtype=np.uint64
+            ),
+            "wl_hash": np.asarray(columns["wl_hash"], dtype=np.uint64),
+            "wl_hash_attr": np.asarray(columns["wl_hash_attr"], dtype=np.uint64),
+        }
+    )
+    return table
+
+
+def group_by_columns(table: pd.DataFrame, columns: Sequence[str]) -> Dict[str, Any]:
+    """Groups the rows of an invariant table by equal values in the given columns, with a vectorised sort instead of a Python loop over groups.
+
+    Args:
+        table (pd.DataFrame): Result of invariant_table
+        columns (Sequence[str]): Columns to group by, e.g. ["vertex_count", "degree_sequence_digest"]
+
+    Returns:
+        Dict[str, Any]: Returns a dict. Keys are the number of the groups, in order of first appearance like group_after_invariant. Values are the row positions of the group.
+    """
+    if len(table) == 0:
+        return {}
+
+    keys = table[list(columns)].to_records(index=False)
+    _, first_positions, inverse = np.unique(
+        keys, return_index=True, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+
+    # Renumber the groups by first appearance
+    group_numbers = np.empty(len(first_positions), dtype=np.int64)
+    group_numbers[np.argsort(first_positions, kind="stable")] = np.arange(
+        len(first_positions)
+    )
+    labels = group_numbers[inverse]
+
+    order = np.argsort(labels, kind="stable")
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    return {
+        f"group_{number}": positions.tolist()
+        for number, positions in enumerate(np.split(order, boundaries))
+    }
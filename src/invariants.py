@@ -1,8 +1,17 @@
-from typing import List, Tuple
+from typing import Hashable, List, Tuple
 import networkx as nx
 from networkx import algebraic_connectivity
 import numpy as np
 
+# Invariants which can be computed for a single reaction centre with compute_invariant
+INVARIANTS = [
+    "vertex_counts",
+    "edge_counts",
+    "vertex_degrees",
+    "algebraic_connectivity",
+    "rank",
+]
+
 
 def vertex_degree_invariant(
     group_centre: nx.Graph, reaction_centre: nx.Graph
@@ -27,17 +36,18 @@ def vertex_degree_invariant(
     return group_centre_invariant, reaction_centre_invariant
 
 
+def compute_algebraic_connectivity(graph: nx.Graph):
+    try:
+        return algebraic_connectivity(graph, normalized=True, tol=1e-6)
+    except nx.NetworkXError:
+        return 0  # disconnected
+    except nx.NetworkXNotImplemented:  # when G is directed
+        return 0  # probably better to handle this differently
+
+
 def algebraic_connectivity_invariant(
     group_centre: nx.Graph, reaction_centre: nx.Graph
 ) -> Tuple[float, float]:
-    def compute_algebraic_connectivity(graph: nx.Graph):
-        try:
-            return algebraic_connectivity(graph, normalized=True, tol=1e-6)
-        except nx.NetworkXError:
-            return 0  # disconnected
-        except nx.NetworkXNotImplemented:  # when G is directed
-            return 0  # probably better to handle this differently
-
     group_centre_connectivity = compute_algebraic_connectivity(group_centre)
     reaction_centre_connectivity = compute_algebraic_connectivity(reaction_centre)
 
@@ -122,3 +132,29 @@ def compressed_labels_invariant_check(compressed_label_1, compressed_label_2):
         return True
     else:
         return False
+
+
+def compute_invariant(reaction_centre: nx.Graph, invariant: str) -> Hashable:
+    """Computes one invariant of a single reaction centre as hashable value, so reactions can be grouped by dict lookup instead of comparing against every group. The invariant names are the ones of group_after_invariant
+
+    Args:
+
+        reaction_centre (nx.Graph): reaction centre from your reactions list
+        invariant (str): Select invariant
+
+    Returns:
+        Hashable: the invariant of the reaction centre
+    """
+    match invariant:
+        case "vertex_counts":
+            return reaction_centre.number_of_nodes()
+        case "edge_counts":
+            return reaction_centre.number_of_edges()
+        case "vertex_degrees":
+            return tuple(sorted(dict(reaction_centre.degree).values()))
+        case "algebraic_connectivity":
+            return compute_algebraic_connectivity(reaction_centre)
+        case "rank":
+            return int(np.linalg.matrix_rank(nx.to_numpy_array(reaction_centre)))
+
+    raise ValueError("Not a valid invariant")
@@ -0,0 +1,175 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+import math
+import networkx as nx
+import networkx.algorithms.isomorphism as iso
+import numpy as np
+
+from src.rc_extract import get_rc_updated
+
+
+def _node_label(graph: nx.Graph, node: Any) -> Tuple[Any, Any]:
+    return graph.nodes[node].get("element"), graph.nodes[node].get("charge")
+
+
+def _features(graph: nx.Graph) -> Dict[str, Any]:
+    """Cheap summaries of a reaction centre used for the edit distance lower bounds."""
+    wl_labels = Counter(
+        (
+            _node_label(graph, node),
+            tuple(
+                sorted(
+                    (repr(graph.edges[node, neighbor].get("order")),)
+                    + tuple(map(repr, _node_label(graph, neighbor)))
+                    for neighbor in graph.neighbors(node)
+                )
+            ),
+        )
+        for node in graph.nodes
+    )
+    return {
+        "nodes": Counter(_node_label(graph, node) for node in graph.nodes),
+        "edges": Counter(order for _, _, order in graph.edges.data("order")),
+        "wl_labels": wl_labels,
+        "max_degree": max((degree for _, degree in graph.degree), default=0),
+    }
+
+
+def _multiset_lower_bound(counter_1: Counter, counter_2: Counter) -> int:
+    # Every element without a partner needs at least one substitution, insertion or deletion
+    return max(sum(counter_1.values()), sum(counter_2.values())) - sum(
+        (counter_1 & counter_2).values()
+    )
+
+
+def edit_distance_lower_bound(
+    features_1: Dict[str, Any], features_2: Dict[str, Any]
+) -> float:
+    """Lower bound of the graph edit distance with unit costs (as in nx.graph_edit_distance with node_match and edge_match).
+
+    Node and edge operations are counted separately, so the node label and edge label multiset bounds add up. One edit operation changes the Weisfeiler-Lehman label (node label + neighbor labels) of at most max degree + 1 nodes, which gives the second bound.
+    """
+    label_bound = _multiset_lower_bound(
+        features_1["nodes"], features_2["nodes"]
+    ) + _multiset_lower_bound(features_1["edges"], features_2["edges"])
+
+    wl_difference = sum(
+        ((features_1["wl_labels"] - features_2["wl_labels"])).values()
+    ) + sum((features_2["wl_labels"] - features_1["wl_labels"]).values())
+    max_degree = max(features_1["max_degree"], features_2["max_degree"])
+    wl_bound = math.ceil(wl_difference / (2 * (max_degree + 1)))
+
+    return max(label_bound, wl_bound)
+
+
+class NearestClusterIndex:
+    """Finds the clusters whose representative reaction centre is closest to a query by graph edit distance.
+
+    Candidates are pruned in three steps: a vectorised node/edge count bound over all representatives, the label multiset and Weisfeiler-Lehman histogram bounds, and only then the (exact or approximate) edit distance of networkx, bounded by the threshold.
+
+    Args:
+        cluster_dict (Dict[str, Any]): Result of one of the cluster_* functions. The first reaction of each cluster is the representative
+    """
+
+    def __init__(self, cluster_dict: Dict[str, Any]) -> None:
+        self.cluster_keys: List[str] = []
+        self.representatives: List[nx.Graph] = []
+        self.features: List[Dict[str, Any]] = []
+
+        for key, values in cluster_dict.items():
+            if not values:
+                continue
+            reaction_centre = get_rc_updated(values[0]["ITS"]).copy()
+            self.cluster_keys.append(key)
+            self.representatives.append(reaction_centre)
+            self.features.append(_features(reaction_centre))
+
+        self.node_counts = np.array(
+            [graph.number_of_nodes() for graph in self.representatives], dtype=np.int64
+        )
+        self.edge_counts = np.array(
+            [graph.number_of_edges() for graph in self.representatives], dtype=np.int64
+        )
+
+    def query(
+        self,
+        reaction_centre: nx.Graph,
+        threshold: float,
+        k: Optional[int] = None,
+        method: str = "exact",
+        timeout: Optional[float] = None,
+    ) -> List[Tuple[str, float]]:
+        """Returns the clusters with an edit distance of at most threshold to reaction_centre.
+
+        Args:
+            reaction_centre (nx.Graph): Query reaction centre with element and charge node attributes and order edge attributes
+            threshold (float): Maximal edit distance
+            k (Optional[int]): Return only the k nearest clusters. The threshold is tightened while searching. Defaults to None (all)
+            method (str): "exact" for nx.graph_edit_distance or "approximate" for the first upper bound of nx.optimize_graph_edit_distance. Defaults to "exact"
+            timeout (Optional[float]): Seconds per edit distance computation, passed on to networkx. When it runs out, networkx returns the best distance found so far, so even with method "exact" the distance may only be an upper bound. Defaults to None
+
+        Returns:
+            List[Tuple[str, float]]: Pairs of cluster key and edit distance, nearest first
+        """
+        if method not in ("exact", "approximate"):
+            raise ValueError("Not a valid method")
+        if k is not None and k < 1:
+            raise ValueError("k must be at least 1")
+
+        node_match = iso.categorical_node_match(["element", "charge"], [None, None])
+        edge_match = iso.categorical_edge_match("order", None)
+        query_features = _features(reaction_centre)
+
+        # Every node or edge count difference needs at least one insertion or deletion
+        count_bounds = np.abs(
+            self.node_counts - reaction_centre.number_of_nodes()
+        ) + np.abs(self.edge_counts - reaction_centre.number_of_edges())
+        candidates = [
+            (
+                edit_distance_lower_bound(self.features[position], query_features),
+                position,
+            )
+            for position in np.flatnonzero(count_bounds <= threshold)
+        ]
+        candidates.sort()
+
+        results: List[Tuple[float, str]] = []
+        for lower_bound, position in candidates:
+            if lower_bound > threshold:
+                break
+
+            if method == "exact":
+                distance = nx.graph_edit_distance(
+                    self.representatives[position],
+                    reaction_centre,
+                    node_match=node_match,
+                    edge_match=edge_match,
+                    upper_bound=threshold,
+                    timeout=timeout,
+                )
+            else:
+                distance = next(
+                    nx.optimize_graph_edit_distance(
+                        self.representatives[position],
+                        reaction_centre,
+                        node_match=node_match,
+                        edge_match=edge_match,
+                        upper_bound=threshold,
+                    ),
+                    None,
+                )
+
+            if distance is None or distance > threshold:
+                continue
+
+            results.append((distance, self.cluster_keys[position]))
+            if k is not None and len(results) >= k:
+                # Only clusters closer than the current k-th result are still of interest
+                results.sort()
+                results = results[:k]
+                threshold = results[-1][0]
+
+        results.sort()
+        if k is not None:
+            results = results[:k]
+        return [(key, float(distance)) for distance, key in results]
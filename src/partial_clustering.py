@@ -0,0 +1,163 @@
+from typing import Any, Dict, Hashable, List
+import gzip
+import pickle
+import networkx as nx
+
+from src.rc_extract import get_rc_updated
+from src.reaction_signatures import reaction_centre_wl_hash
+
+PARTIAL_FORMAT_VERSION = 1
+
+
+def graph_to_records(graph: nx.Graph) -> Dict[str, List[Any]]:
+    """Converts a graph into plain lists of nodes and edges with their attributes, so partial results do not depend on networkx internals."""
+    return {
+        "nodes": [(node, dict(data)) for node, data in graph.nodes(data=True)],
+        "edges": [(u, v, dict(data)) for u, v, data in graph.edges(data=True)],
+    }
+
+
+def records_to_graph(records: Dict[str, List[Any]]) -> nx.Graph:
+    """Inverse of graph_to_records."""
+    graph = nx.Graph()
+    graph.add_nodes_from(records["nodes"])
+    graph.add_edges_from(records["edges"])
+    return graph
+
+
+def build_partial_clustering(
+    list_reactions: List[Dict[Any, Any]],
+    id_key: str = "R-id",
+    iterations: int = 3,
+    use_edge_node_attr: bool = True,
+) -> Dict[str, Any]:
+    """Clusters one shard of reactions into a partial result that can be merged with the partial results of other shards.
+
+    Clusters are keyed by the Weisfeiler-Lehman hash of the reaction centre instead of a positional counter, so the same cluster has the same key on every machine. Every entry stores the local cluster key, the sorted member ids and a representative (the member with the smallest id and its reaction centre).
+
+    Args:
+        list_reactions (List[Dict[Any, Any]]): A list of reactions
+        id_key (str): Key of the globally unique reaction id. Defaults to "R-id"
+        iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to True.
+
+    Returns:
+        Dict[str, Any]: The partial clustering
+    """
+    clusters: Dict[str, Dict[str, Any]] = {}
+
+    for reaction in list_reactions:
+        reaction_id = reaction[id_key]
+        signature = reaction_centre_wl_hash(
+            reaction, iterations=iterations, use_edge_node_attr=use_edge_node_attr
+        )
+        entry = clusters.get(signature)
+
+        if entry is None:
+            clusters[signature] = {
+                "members": [reaction_id],
+                "representative": _representative(reaction_id, reaction),
+            }
+            continue
+
+        entry["members"].append(reaction_id)
+        if reaction_id < entry["representative"]["id"]:
+            entry["representative"] = _representative(reaction_id, reaction)
+
+    for entry in clusters.values():
+        entry["members"] = sorted(set(entry["members"]))
+
+    return _finalise(clusters, iterations, use_edge_node_attr)
+
+
+def merge_partial_clusterings(*partials: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges any number of partial clusterings into one.
+
+    Members are united per signature and the representative with the smallest id wins. Cluster keys are reassigned in sorted signature order, so the merge is associative and independent of the shard order. Merging the result again with further partials is allowed.
+
+    Args:
+        *partials (Dict[str, Any]): Results of build_partial_clustering or merge_partial_clusterings
+
+    Returns:
+        Dict[str, Any]: The merged partial clustering
+    """
+    if not partials:
+        raise ValueError("At least one partial clustering is needed")
+
+    iterations = partials[0]["iterations"]
+    use_edge_node_attr = partials[0]["use_edge_node_attr"]
+    clusters: Dict[str, Dict[str, Any]] = {}
+
+    for partial in partials:
+        if partial.get("format") != PARTIAL_FORMAT_VERSION:
+            raise ValueError("Not a valid partial clustering")
+        if (
+            partial["iterations"] != iterations
+            or partial["use_edge_node_attr"] != use_edge_node_attr
+        ):
+            raise ValueError("Partial clusterings were built with different signatures")
+
+        for signature, entry in partial["clusters"].items():
+            merged = clusters.get(signature)
+
+            if merged is None:
+                clusters[signature] = {
+                    "members": set(entry["members"]),
+                    "representative": entry["representative"],
+                }
+                continue
+
+            merged["members"].update(entry["members"])
+            if entry["representative"]["id"] < merged["representative"]["id"]:
+                merged["representative"] = entry["representative"]
+
+    for entry in clusters.values():
+        entry["members"] = sorted(entry["members"])
+
+    return _finalise(clusters, iterations, use_edge_node_attr)
+
+
+def partial_to_cluster_dict(partial: Dict[str, Any]) -> Dict[str, List[Hashable]]:
+    """Converts a partial clustering into the usual cluster dict. Keys are the cluster keys, values are the member ids."""
+    return {
+        entry["cluster"]: list(entry["members"])
+        for entry in partial["clusters"].values()
+    }
+
+
+def save_partial_clustering(partial: Dict[str, Any], path: str) -> None:
+    """Saves a partial clustering as gzip compressed pickle."""
+    with gzip.open(path, "wb") as file:
+        pickle.dump(partial, file)
+
+
+def load_partial_clustering(path: str) -> Dict[str, Any]:
+    """Loads a partial clustering written by save_partial_clustering."""
+    with gzip.open(path, "rb") as file:
+        partial = pickle.load(file)
+
+    if not isinstance(partial, dict) or partial.get("format") != PARTIAL_FORMAT_VERSION:
+        raise ValueError("Not a valid partial clustering")
+    return partial
+
+
+def _representative(reaction_id: Hashable, reaction: Dict[Any, Any]) -> Dict[str, Any]:
+    return {
+        "id": reaction_id,
+        "reaction_centre": graph_to_records(get_rc_updated(reaction["ITS"])),
+    }
+
+
+def _finalise(
+    clusters: Dict[str, Dict[str, Any]], iterations: int, use_edge_node_attr: bool
+) -> Dict[str, Any]:
+    # Local cluster keys only depend on the set of signatures, never on the input order
+    for counter, signature in enumerate(sorted(clusters)):
+        clusters[signature]["cluster"] = f"cluster_{counter}"
+
+    return {
+        "format": PARTIAL_FORMAT_VERSION,
+        "iterations": iterations,
+        "use_edge_node_attr": use_edge_node_attr,
+        "clusters": {signature: clusters[signature] for signature in sorted(clusters)},
+    }
@@ -0,0 +1,123 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+def flatten_clustering(clustering: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Flattens the nested result of cluster_after_invariant_grouping into one cluster dict with keys "group_key/cluster_key". Flat results are returned unchanged."""
+    flat: Dict[str, List[Any]] = {}
+    for key, values in clustering.items():
+        if isinstance(values, dict):
+            for inner_key, inner_values in values.items():
+                flat[f"{key}/{inner_key}"] = inner_values
+        else:
+            flat[key] = values
+    return flat
+
+
+def compare_clusterings(
+    reference: Dict[str, Any],
+    candidate: Dict[str, Any],
+    id_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compares two clusterings of the same reactions, e.g. cluster_reactions against a faster method.
+
+    Both clusterings are turned into cluster id arrays, the contingency table is built with NumPy and all numbers are derived from it.
+
+    Args:
+        reference (Dict[str, Any]): The reference clustering (flat or nested)
+        candidate (Dict[str, Any]): The clustering to check (flat or nested)
+        id_key (Optional[str]): Reaction key used for matching the reactions of both clusterings. Defaults to None (the same reaction objects)
+
+    Returns:
+        Dict[str, Any]: adjusted_rand_index, pair_precision (low if the candidate over-merges), pair_recall (low if the candidate over-splits), split_clusters (reference cluster -> candidate clusters) and merged_clusters (candidate cluster -> reference clusters)
+    """
+    reference = flatten_clustering(reference)
+    candidate = flatten_clustering(candidate)
+    reference_keys = list(reference)
+    candidate_keys = list(candidate)
+
+    # Reactions are dicts and not hashable, so they are identified by object id if no id_key is given
+    def identifier(reaction: Dict[Any, Any]) -> Any:
+        return id(reaction) if id_key is None else reaction[id_key]
+
+    positions: Dict[Any, int] = {}
+    reference_labels = []
+    for label, key in enumerate(reference_keys):
+        for reaction in reference[key]:
+            positions[identifier(reaction)] = len(reference_labels)
+            reference_labels.append(label)
+
+    candidate_labels = np.full(len(reference_labels), -1, dtype=np.int64)
+    n_candidate = 0
+    for label, key in enumerate(candidate_keys):
+        for reaction in candidate[key]:
+            position = positions.get(identifier(reaction))
+            if position is None:
+                raise ValueError("Clusterings do not contain the same reactions")
+            candidate_labels[position] = label
+            n_candidate += 1
+
+    labels_a = np.asarray(reference_labels, dtype=np.int64)
+    labels_b = candidate_labels
+    if n_candidate != len(labels_a) or (labels_b < 0).any():
+        raise ValueError("Clusterings do not contain the same reactions")
+
+    # Sparse contingency table: only the non-empty cells
+    cells, cell_counts = np.unique(
+        labels_a * max(len(candidate_keys), 1) + labels_b, return_counts=True
+    )
+    cell_rows = cells // max(len(candidate_keys), 1)
+    cell_columns = cells % max(len(candidate_keys), 1)
+
+    pairs_together = _pairs(cell_counts).sum()
+    pairs_reference = _pairs(np.bincount(labels_a, minlength=len(reference_keys))).sum()
+    pairs_candidate = _pairs(np.bincount(labels_b, minlength=len(candidate_keys))).sum()
+    pairs_total = _pairs(np.array([len(labels_a)])).sum()
+
+    expected = pairs_reference * pairs_candidate / pairs_total if pairs_total else 0.0
+    maximum = (pairs_reference + pairs_candidate) / 2
+    adjusted_rand_index = (
+        float((pairs_together - expected) / (maximum - expected))
+        if maximum != expected
+        else 1.0
+    )
+
+    split_clusters = {
+        reference_keys[row]: [candidate_keys[column] for column in columns]
+        for row, columns in _cells_by(cell_rows, cell_columns)
+    }
+    merged_clusters = {
+        candidate_keys[column]: [reference_keys[row] for row in rows]
+        for column, rows in _cells_by(cell_columns, cell_rows)
+    }
+
+    return {
+        "adjusted_rand_index": adjusted_rand_index,
+        "pair_precision": (
+            float(pairs_together / pairs_candidate) if pairs_candidate else 1.0
+        ),
+        "pair_recall": (
+            float(pairs_together / pairs_reference) if pairs_reference else 1.0
+        ),
+        "split_clusters": split_clusters,
+        "merged_clusters": merged_clusters,
+    }
+
+
+def _pairs(counts: np.ndarray) -> np.ndarray:
+    counts = counts.astype(np.int64)
+    return counts * (counts - 1) // 2
+
+
+def _cells_by(group_labels: np.ndarray, other_labels: np.ndarray):
+    """Yields (label, other labels) for every label of group_labels with more than one non-empty cell."""
+    order = np.argsort(group_labels, kind="stable")
+    group_labels = group_labels[order]
+    other_labels = other_labels[order]
+    boundaries = np.flatnonzero(np.diff(group_labels)) + 1
+
+    for start, end in zip(
+        np.concatenate(([0], boundaries)), np.concatenate((boundaries, [len(order)]))
+    ):
+        if end - start > 1:
+            yield int(group_labels[start]), other_labels[start:end].tolist()
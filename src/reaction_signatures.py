@@ -0,0 +1,35 @@
+from typing import Any, Dict
+import networkx as nx
+
+from src.rc_extract import get_rc_updated
+from src.add_combined_node_attributes import combine_charge_element_to_node
+
+
+def reaction_centre_wl_hash(
+    reaction: Dict[Any, Any],
+    iterations: int = 3,
+    use_edge_node_attr: bool = True,
+) -> str:
+    """Computes the Weisfeiler-Lehman hash of the reaction centre of a single reaction. This is the same signature cluster_weisfeiler_lehman_nx compares, but the ITS graph of the reaction is not changed.
+
+    Args:
+        reaction (Dict[Any, Any]): A reaction with an "ITS" graph
+        iterations (int): Number of neighbor aggregations to perform. Defaults to 3
+        use_edge_node_attr (bool): Set to True for using edge and node attributes (order, charge, element). Defaults to True.
+
+    Returns:
+        str: The Weisfeiler-Lehman hash of the reaction centre
+    """
+    # Copy, otherwise the combined attribute is written into the ITS graph via the subgraph view
+    reaction_centre = get_rc_updated(reaction["ITS"]).copy()
+
+    if use_edge_node_attr:
+        combine_charge_element_to_node(reaction_centre)
+        return nx.weisfeiler_lehman_graph_hash(
+            reaction_centre,
+            iterations=iterations,
+            edge_attr="order",
+            node_attr="element_charge",
+        )
+
+    return nx.weisfeiler_lehman_graph_hash(reaction_centre, iterations=iterations)
@@ -0,0 +1,118 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import argparse
+import gzip
+import pickle
+import sys
+
+
+def _open_pickle(path: str):
+    """Opens a pickle file, gzip compressed or not. The gzip magic bytes decide, not the file name."""
+    with open(path, "rb") as file:
+        magic = file.read(2)
+
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_reactions(path: str) -> Iterator[Dict[Any, Any]]:
+    """Yields the reactions of a pickle file one by one.
+
+    The file may either hold a stream of pickled objects (e.g. one pickle.dump per reaction or per chunk of reactions, as written by write_reaction_stream), which is read lazily, or a single pickled list like data/ITS_graphs.pkl.gz. For a single list the whole list has to be unpickled first, so only the stream format keeps memory bounded. Use convert_to_stream once to rewrite such a file.
+
+    Args:
+        path (str): Path to the (optionally gzip compressed) pickle file
+
+    Returns:
+        Iterator[Dict[Any, Any]]: The reactions in file order
+    """
+    with _open_pickle(path) as file:
+        while True:
+            try:
+                entry = pickle.load(file)
+            except EOFError:
+                return
+
+            if isinstance(entry, list):
+                yield from entry
+            else:
+                yield entry
+
+
+def iter_chunks(
+    reactions: Iterable[Dict[Any, Any]], chunk_size: int
+) -> Iterator[List[Dict[Any, Any]]]:
+    """Groups an iterable of reactions into lists of at most chunk_size reactions.
+
+    Args:
+        reactions (Iterable[Dict[Any, Any]]): The reactions
+        chunk_size (int): Maximal number of reactions per chunk
+
+    Returns:
+        Iterator[List[Dict[Any, Any]]]: The chunks in input order
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    chunk = []
+    for reaction in reactions:
+        chunk.append(reaction)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def write_reaction_stream(
+    reactions: Iterable[Dict[Any, Any]], path: str, chunk_size: int = 1000
+) -> int:
+    """Writes reactions as gzip compressed stream of pickled chunks, which iter_reactions reads with bounded memory.
+
+    Args:
+        reactions (Iterable[Dict[Any, Any]]): The reactions
+        path (str): Path of the output file
+        chunk_size (int): Number of reactions per pickled chunk. Defaults to 1000
+
+    Returns:
+        int: Number of written reactions
+    """
+    written = 0
+    with gzip.open(path, "wb") as file:
+        for chunk in iter_chunks(reactions, chunk_size):
+            pickle.dump(chunk, file)
+            written += len(chunk)
+    return written
+
+
+def convert_to_stream(input_path: str, output_path: str, chunk_size: int = 1000) -> int:
+    """Rewrites a pickle file (e.g. a single pickled list like data/ITS_graphs.pkl.gz) in the stream format of write_reaction_stream. A single list has to be loaded once for this, afterwards every run on the stream file keeps memory bounded.
+
+    Args:
+        input_path (str): Pickle file with the reactions
+        output_path (str): Path of the stream file
+        chunk_size (int): Number of reactions per pickled chunk. Defaults to 1000
+
+    Returns:
+        int: Number of written reactions
+    """
+    return write_reaction_stream(iter_reactions(input_path), output_path, chunk_size)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Rewrite a reaction pickle as stream of pickled chunks."
+    )
+    parser.add_argument("input", help="pickle file with the reactions")
+    parser.add_argument("output", help="output stream file")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    written = convert_to_stream(args.input, args.output, args.chunk_size)
+    print(f"{written} reactions written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
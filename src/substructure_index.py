@@ -0,0 +1,175 @@
+from typing import Any, Dict, Iterator, List, Optional
+import hashlib
+import networkx as nx
+import networkx.algorithms.isomorphism as iso
+import numpy as np
+
+from src.rc_extract import get_rc_updated
+from src.l_neighborhood import find_l_neighborhood_of_rc
+
+
+def _node_label(graph: nx.Graph, node: Any) -> str:
+    return f"{graph.nodes[node]['element']}, {graph.nodes[node]['charge']}"
+
+
+def _edge_label(graph: nx.Graph, u: Any, v: Any) -> str:
+    return str(graph.edges[u, v]["order"])
+
+
+def _labelled_paths(graph: nx.Graph, max_path_length: int) -> Iterator[str]:
+    """Yields all simple paths with up to max_path_length edges as label strings. A path and its reverse give the same string."""
+
+    def extend(path: List[Any], labels: List[str]) -> Iterator[str]:
+        yield "|".join(min(labels, labels[::-1]))
+
+        if len(path) > max_path_length:
+            return
+
+        for neighbor in graph.neighbors(path[-1]):
+            if neighbor in path:
+                continue
+            yield from extend(
+                path + [neighbor],
+                labels
+                + [
+                    _edge_label(graph, path[-1], neighbor),
+                    _node_label(graph, neighbor),
+                ],
+            )
+
+    for node in graph.nodes:
+        yield from extend([node], [_node_label(graph, node)])
+
+
+def _labelled_stars(graph: nx.Graph) -> Iterator[str]:
+    """Yields every node together with each pair of its labelled neighbors (subtrees with three nodes)."""
+    for node in graph.nodes:
+        branches = sorted(
+            f"{_edge_label(graph, node, neighbor)}-{_node_label(graph, neighbor)}"
+            for neighbor in graph.neighbors(node)
+        )
+        for i in range(len(branches)):
+            for j in range(i + 1, len(branches)):
+                yield f"{_node_label(graph, node)}<{branches[i]}+{branches[j]}"
+
+
+def substructure_fingerprint(
+    graph: nx.Graph, n_bits: int = 1024, max_path_length: int = 3
+) -> np.ndarray:
+    """Computes a bitset of labelled paths and small subtrees. If a query is contained in graph, all bits of the query fingerprint are also set in the fingerprint of graph.
+
+    Args:
+        graph (nx.Graph): Graph with element and charge node attributes and order edge attributes
+        n_bits (int): Length of the bitset, a multiple of 64. Defaults to 1024
+        max_path_length (int): Maximal number of edges of the hashed paths. Defaults to 3
+
+    Returns:
+        np.ndarray: The bitset as array of n_bits / 64 unsigned 64 bit integers
+    """
+    if n_bits % 64 != 0:
+        raise ValueError("n_bits must be a multiple of 64")
+
+    fingerprint = np.zeros(n_bits // 64, dtype=np.uint64)
+    features = set(_labelled_paths(graph, max_path_length)) | set(
+        _labelled_stars(graph)
+    )
+
+    for feature in features:
+        bit = (
+            int.from_bytes(
+                hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+            )
+            % n_bits
+        )
+        fingerprint[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+    return fingerprint
+
+
+class SubstructureIndex:
+    """Index for finding all reactions whose reaction centre (or its l-neighborhood) contains a query graph.
+
+    Fingerprints of all indexed graphs are kept in one array, so most reactions are rejected with bitwise operations. Only the remaining candidates are checked with a VF2 subgraph monomorphism test.
+    """
+
+    def __init__(
+        self,
+        n_bits: int = 1024,
+        max_path_length: int = 3,
+        l_neighborhood: int = 0,
+    ) -> None:
+        self.n_bits = n_bits
+        self.max_path_length = max_path_length
+        self.l_neighborhood = l_neighborhood
+        self.graphs: List[nx.Graph] = []
+        self._fingerprint_list: List[np.ndarray] = []
+        self._fingerprints: Optional[np.ndarray] = None
+
+    def add_reactions(self, list_reactions: List[Dict[Any, Any]]) -> None:
+        """Adds reactions to the index. The position in the index is the insertion order.
+
+        Args:
+            list_reactions (List[Dict[Any, Any]]): A list of reactions
+        """
+        for reaction in list_reactions:
+            reaction_centre = get_rc_updated(reaction["ITS"])
+            graph = find_l_neighborhood_of_rc(
+                graph=reaction["ITS"],
+                reaction_centre=reaction_centre,
+                l_neighborhood=self.l_neighborhood,
+            ).copy()
+
+            self.graphs.append(graph)
+            self._fingerprint_list.append(
+                substructure_fingerprint(graph, self.n_bits, self.max_path_length)
+            )
+
+        self._fingerprints = None
+
+    @property
+    def fingerprints(self) -> np.ndarray:
+        if self._fingerprints is None:
+            self._fingerprints = (
+                np.vstack(self._fingerprint_list)
+                if self._fingerprint_list
+                else np.zeros((0, self.n_bits // 64), dtype=np.uint64)
+            )
+        return self._fingerprints
+
+    def screen(self, query: nx.Graph) -> np.ndarray:
+        """Returns the index positions whose fingerprint contains every bit of the query fingerprint. These are candidates only."""
+        query_fingerprint = substructure_fingerprint(
+            query, self.n_bits, self.max_path_length
+        )
+        mask = np.all(
+            (self.fingerprints & query_fingerprint) == query_fingerprint, axis=1
+        )
+        return np.flatnonzero(mask)
+
+    def search(self, query: nx.Graph) -> List[int]:
+        """Finds all indexed reactions containing the query graph (not necessarily induced). Element, charge and order have to match.
+
+        Args:
+            query (nx.Graph): Query graph with element and charge node attributes and order edge attributes
+
+        Returns:
+            List[int]: Index positions of the matching reactions
+        """
+        node_match = iso.categorical_node_match(["element", "charge"], [None, None])
+        edge_match = iso.categorical_edge_match("order", None)
+
+        matches = []
+        for position in self.screen(query):
+            graph_matcher = iso.GraphMatcher(
+                self.graphs[position],
+                query,
+                node_match=node_match,
+                edge_match=edge_match,
+            )
+            if graph_matcher.subgraph_is_monomorphic():
+                matches.append(int(position))
+
+        return matches
+
+    def __len__(self) -> int:
+        return len(self.graphs)
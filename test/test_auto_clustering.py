@@ -0,0 +1,45 @@
+from src.auto_clustering import cluster_auto, choose_clustering_strategy
+from src.clustering import cluster_reactions
+from src.clustering_budget import ClusteringBudget
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_choose_strategy():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    decision = choose_clustering_strategy(data, sample_size=100)
+    assert decision["invariant"] in [
+        None,
+        "vertex_counts",
+        "edge_counts",
+        "vertex_degrees",
+        "rank",
+    ]
+    assert decision["estimated_runtime"] == min(
+        candidate["estimated_runtime"] for candidate in decision["candidates"].values()
+    )
+
+
+def test_cluster_auto():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    result = cluster_auto(data, sample_size=100)
+    result_flattened = [entry for entries in result.values() for entry in entries]
+    assert len(result_flattened) == len(data)
+    assert len(result) == len(cluster_reactions(data))
+
+
+def test_choose_strategy_fallback_decisions(caplog):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    decision = choose_clustering_strategy(data, sample_size=100)
+
+    caplog.set_level("INFO", logger="src.auto_clustering")
+    caplog.clear()
+    for fallback in [
+        choose_clustering_strategy([]),
+        choose_clustering_strategy(
+            data, sample_size=100, budget=ClusteringBudget(time_budget=0)
+        ),
+    ]:
+        assert fallback.keys() == decision.keys()
+        assert fallback["invariant"] is None
+        assert fallback["candidates"] == {}
+    assert sum(message.startswith("Chosen") for message in caplog.messages) == 2
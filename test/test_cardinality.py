@@ -0,0 +1,33 @@
+from src.cardinality import (
+    HyperLogLog,
+    estimate_distinct_classes,
+    merge_sketches,
+    sketch_distinct_classes,
+)
+from src.clustering import cluster_weisfeiler_lehman_nx
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_hyperloglog_accuracy():
+    sketch = HyperLogLog(precision=12)
+    for value in range(50_000):
+        sketch.add(str(value))
+    assert abs(sketch.estimate() - 50_000) / 50_000 < 0.05
+
+
+def test_estimate_distinct_classes():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    estimates = estimate_distinct_classes(
+        sketch_distinct_classes(data, signature_types=["weisfeiler_lehman_attr"])
+    )
+    expected = len(cluster_weisfeiler_lehman_nx(data, use_edge_node_attr=True))
+    assert abs(estimates["weisfeiler_lehman_attr@3"] - expected) <= 0.05 * expected
+
+
+def test_merge_sketches():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    merged = merge_sketches(
+        sketch_distinct_classes(data[:500]), sketch_distinct_classes(data[500:])
+    )
+    whole = sketch_distinct_classes(data)
+    assert estimate_distinct_classes(merged) == estimate_distinct_classes(whole)
@@ -0,0 +1,35 @@
+from src.cascade import cluster_cascade
+from src.clustering import cluster_reactions
+from synutility.SynIO.data_type import load_from_pickle
+import pytest
+
+
+def test_fail_stage():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    with pytest.raises(ValueError):
+        cluster_cascade(data, stages=["I am not a stage"])
+
+
+def test_cascade_matches_cluster_reactions():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    result, statistics = cluster_cascade(data)
+    result_flattened = [entry for entries in result.values() for entry in entries]
+    assert len(result_flattened) == len(data)
+    assert len(result) == len(cluster_reactions(data))
+    assert [entry["stage"] for entry in statistics] == [
+        "vertex_counts",
+        "edge_counts",
+        "vertex_degrees",
+        "weisfeiler_lehman",
+        "exact",
+    ]
+    assert statistics[-1]["buckets"] == len(result)
+
+
+def test_cascade_with_custom_stage():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    result, statistics = cluster_cascade(
+        data, stages=[("nodes_in_its", lambda reaction: len(reaction["ITS"]))]
+    )
+    assert statistics[0]["buckets_checked"] == 1
+    assert len(result) == len({len(reaction["ITS"]) for reaction in data})
@@ -0,0 +1,24 @@
+from src.cluster_cli import stream_cluster
+from src.reaction_stream import iter_reactions, write_reaction_stream
+from src.clustering import cluster_weisfeiler_lehman_nx
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_stream_cluster(tmp_path):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    input_path = tmp_path / "reactions.stream.pkl.gz"
+    assert write_reaction_stream(data, str(input_path), chunk_size=100) == len(data)
+    assert len(list(iter_reactions(str(input_path)))) == len(data)
+
+    output_path = tmp_path / "clusters.tsv"
+    representatives = stream_cluster(
+        str(input_path), str(output_path), chunk_size=128, workers=2
+    )
+
+    with open(output_path) as file:
+        lines = file.read().splitlines()[1:]
+    assert len(lines) == len(data)
+
+    expected = cluster_weisfeiler_lehman_nx(data, use_edge_node_attr=True)
+    assert len(representatives) == len(expected)
+    assert sum(entry["size"] for entry in representatives.values()) == len(data)
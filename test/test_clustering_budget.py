@@ -0,0 +1,119 @@
+from src.auto_clustering import cluster_auto
+from src.cluster_cli import stream_cluster
+from src import clustering
+from src.clustering import cluster_reactions, cluster_weisfeiler_lehman_nx
+from src.clustering_budget import CancellationToken, ClusteringBudget
+from src.reaction_stream import write_reaction_stream
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_zero_time_budget():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    budget = ClusteringBudget(time_budget=0)
+    result = cluster_reactions(data, budget=budget)
+    assert result == {}
+    assert len(budget.unverified) == len(data)
+    assert budget.stop_reason == "time_budget"
+
+
+def test_cancellation_from_progress_callback():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    token = CancellationToken()
+
+    def progress_callback(function_name, done, total):
+        if done == 100:
+            token.cancel()
+
+    budget = ClusteringBudget(
+        progress_callback=progress_callback, cancellation_token=token
+    )
+    result = cluster_weisfeiler_lehman_nx(data, budget=budget)
+    result_flattened = [entry for entries in result.values() for entry in entries]
+    assert len(result_flattened) == 100
+    assert len(budget.unverified) == len(data) - 100
+    assert budget.stop_reason == "cancelled"
+
+
+def test_step_limit_keeps_every_reaction():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    budget = ClusteringBudget(max_isomorphism_steps=1)
+    result = cluster_reactions(data, budget=budget)
+    result_flattened = [entry for entries in result.values() for entry in entries]
+    assert len(budget.unverified) > 0
+    assert len(result_flattened) + len(budget.unverified) == len(data)
+
+
+def test_undecided_check_keeps_scanning(monkeypatch):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    first, second = [values[0] for values in cluster_reactions(data).values()][:2]
+    reaction_centres_isomorphic = clustering._reaction_centres_isomorphic
+    calls = []
+
+    # Checks: second vs cluster_0, then third vs cluster_0 (undecided) and vs cluster_1
+    def undecided_second_call(cluster_centre, reaction_centre, matchers, max_steps):
+        calls.append(None)
+        if len(calls) == 2:
+            return None
+        return reaction_centres_isomorphic(
+            cluster_centre, reaction_centre, matchers, max_steps
+        )
+
+    monkeypatch.setattr(
+        clustering, "_reaction_centres_isomorphic", undecided_second_call
+    )
+    budget = ClusteringBudget(max_isomorphism_steps=10**6)
+    result = cluster_reactions([first, second, second], budget=budget)
+    assert result == {"cluster_0": [first], "cluster_1": [second, second]}
+    assert budget.unverified == []
+
+    calls.clear()
+    budget = ClusteringBudget(max_isomorphism_steps=10**6)
+    result = cluster_reactions([first, second, first], budget=budget)
+    assert result == {"cluster_0": [first], "cluster_1": [second]}
+    assert budget.unverified == [first]
+
+
+def test_cluster_auto_zero_time_budget():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    budget = ClusteringBudget(time_budget=0)
+    result = cluster_auto(data, sample_size=100, budget=budget)
+    assert result == {}
+    assert len(budget.unverified) == len(data)
+    assert budget.stop_reason == "time_budget"
+
+
+def test_stream_cluster_cancellation(tmp_path):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    input_path = tmp_path / "reactions.stream.pkl.gz"
+    write_reaction_stream(data, str(input_path), chunk_size=100)
+
+    for workers in [1, 2]:
+        token = CancellationToken()
+        progress = []
+
+        def progress_callback(function_name, done, total):
+            progress.append((function_name, done, total))
+            if done == 200:
+                token.cancel()
+
+        budget = ClusteringBudget(
+            progress_callback=progress_callback, cancellation_token=token
+        )
+        output_path = tmp_path / f"clusters_{workers}.tsv"
+        representatives = stream_cluster(
+            str(input_path),
+            str(output_path),
+            chunk_size=100,
+            workers=workers,
+            budget=budget,
+        )
+
+        with open(output_path) as file:
+            lines = file.read().splitlines()[1:]
+        assert len(lines) == 200
+        assert sum(entry["size"] for entry in representatives.values()) == 200
+        assert progress == [
+            ("stream_cluster", 100, None),
+            ("stream_cluster", 200, None),
+        ]
+        assert budget.stop_reason == "cancelled"
@@ -0,0 +1,43 @@
+from src.cascade import cluster_cascade
+from src.clustering import cluster_reactions, cluster_weisfeiler_lehman_nx
+from src.deduplication import cluster_deduplicated, collapse_duplicates
+from synutility.SynIO.data_type import load_from_pickle
+import pytest
+
+
+def test_collapse_duplicates():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    unique_reactions, multiplicities = collapse_duplicates(data + data[:10])
+    assert len(unique_reactions) <= len(data)
+    assert sum(len(positions) for positions in multiplicities) == len(data) + 10
+    group_of = {
+        position: positions for positions in multiplicities for position in positions
+    }
+    assert all(len(data) + idx in group_of[idx] for idx in range(10))
+
+
+def test_cluster_deduplicated():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    for cluster_function in [cluster_reactions, cluster_weisfeiler_lehman_nx]:
+        expected = cluster_function(data)
+        result = cluster_deduplicated(data, cluster_function)
+        assert {key: sorted(map(id, values)) for key, values in result.items()} == {
+            key: sorted(map(id, values)) for key, values in expected.items()
+        }
+
+
+def test_cluster_deduplicated_cascade():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    cluster_dict, statistics = cluster_deduplicated(data + data[:10], cluster_cascade)
+    result_flattened = [entry for entries in cluster_dict.values() for entry in entries]
+    assert len(result_flattened) == len(data) + 10
+    assert len(cluster_dict) == len(cluster_cascade(data)[0])
+    assert [stage["stage"] for stage in statistics] == [
+        stage["stage"] for stage in cluster_cascade(data)[1]
+    ]
+
+
+def test_cluster_deduplicated_unsupported_result():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    with pytest.raises(TypeError):
+        cluster_deduplicated(data, lambda reactions: len(reactions))
@@ -0,0 +1,31 @@
+from src.clustering import cluster_weisfeiler_lehman_nx
+from src.external_grouping import group_external
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_external_grouping_matches_wl_nx(tmp_path):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    positions = {id(reaction): idx for idx, reaction in enumerate(data)}
+    expected = {
+        tuple(sorted(positions[id(reaction)] for reaction in values))
+        for values in cluster_weisfeiler_lehman_nx(
+            data, use_edge_node_attr=True
+        ).values()
+    }
+
+    result = list(group_external(data, run_size=128, tmp_dir=str(tmp_path)))
+    assert {tuple(members) for _, members in result} == expected
+    assert result == list(group_external(data, run_size=len(data)))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_external_grouping_with_more_runs_than_fan_in(tmp_path):
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    expected = list(group_external(data, run_size=len(data)))
+
+    # 1000 / 7 = 143 runs, merged in several passes with at most 4 runs open
+    result = list(
+        group_external(data, run_size=7, max_open_runs=4, tmp_dir=str(tmp_path))
+    )
+    assert result == expected
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,28 @@
+from src.clustering import group_after_invariant
+from src.invariant_table import group_by_columns, invariant_table
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_invariant_table():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    table = invariant_table(data)
+    assert len(table) == len(data)
+    assert table["wl_hash"].dtype == "uint64"
+    assert table["algebraic_connectivity"].dtype == "float32"
+
+
+def test_group_by_columns_matches_group_after_invariant():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    table = invariant_table(data)
+    positions = {id(reaction): idx for idx, reaction in enumerate(data)}
+
+    for column, invariant in [
+        ("vertex_count", "vertex_counts"),
+        ("edge_count", "edge_counts"),
+        ("degree_sequence_digest", "vertex_degrees"),
+    ]:
+        expected = {
+            key: [positions[id(reaction)] for reaction in values]
+            for key, values in group_after_invariant(data, invariant=invariant).items()
+        }
+        assert group_by_columns(table, [column]) == expected
@@ -0,0 +1,50 @@
+import networkx as nx
+import networkx.algorithms.isomorphism as iso
+from src.clustering import cluster_weisfeiler_lehman_nx
+from src.nearest_cluster import NearestClusterIndex
+from src.rc_extract import get_rc_updated
+from synutility.SynIO.data_type import load_from_pickle
+import pytest
+
+
+def test_nearest_cluster_of_representative():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    cluster_dict = cluster_weisfeiler_lehman_nx(data, use_edge_node_attr=True)
+    index = NearestClusterIndex(cluster_dict)
+    key, values = next(iter(cluster_dict.items()))
+
+    result = index.query(get_rc_updated(values[0]["ITS"]), threshold=2, k=1)
+    assert result == [(key, 0.0)]
+
+
+def test_nearest_cluster_matches_brute_force():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    cluster_dict = cluster_weisfeiler_lehman_nx(data[:200], use_edge_node_attr=True)
+    index = NearestClusterIndex(cluster_dict)
+    query = get_rc_updated(data[500]["ITS"])
+
+    node_match = iso.categorical_node_match(["element", "charge"], [None, None])
+    edge_match = iso.categorical_edge_match("order", None)
+    expected = set()
+    for key, values in cluster_dict.items():
+        distance = nx.graph_edit_distance(
+            get_rc_updated(values[0]["ITS"]),
+            query,
+            node_match=node_match,
+            edge_match=edge_match,
+            upper_bound=2,
+        )
+        if distance is not None and distance <= 2:
+            expected.add((key, float(distance)))
+
+    assert set(index.query(query, threshold=2)) == expected
+
+
+def test_nearest_cluster_invalid_k():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    index = NearestClusterIndex(
+        cluster_weisfeiler_lehman_nx(data[:50], use_edge_node_attr=True)
+    )
+    for k in [0, -1]:
+        with pytest.raises(ValueError):
+            index.query(get_rc_updated(data[0]["ITS"]), threshold=2, k=k)
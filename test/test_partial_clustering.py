@@ -0,0 +1,37 @@
+from src.partial_clustering import (
+    build_partial_clustering,
+    merge_partial_clusterings,
+    partial_to_cluster_dict,
+)
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_merge_is_order_independent():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    shard_1 = build_partial_clustering(data[:300])
+    shard_2 = build_partial_clustering(data[300:700])
+    shard_3 = build_partial_clustering(data[700:])
+
+    merged = merge_partial_clusterings(shard_1, shard_2, shard_3)
+    assert merged == merge_partial_clusterings(shard_3, shard_1, shard_2)
+    assert merged == merge_partial_clusterings(
+        merge_partial_clusterings(shard_1, shard_2), shard_3
+    )
+    assert merged == merge_partial_clusterings(
+        shard_1, merge_partial_clusterings(shard_2, shard_3)
+    )
+
+
+def test_merge_equals_single_shard():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    merged = merge_partial_clusterings(
+        build_partial_clustering(data[:500]), build_partial_clustering(data[500:])
+    )
+    assert merged == build_partial_clustering(data)
+
+    result_flattened = [
+        entry
+        for entries in partial_to_cluster_dict(merged).values()
+        for entry in entries
+    ]
+    assert len(result_flattened) == len(data)
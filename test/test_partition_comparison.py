@@ -0,0 +1,27 @@
+from src.clustering import cluster_reactions, cluster_weisfeiler_lehman_nx
+from src.partition_comparison import compare_clusterings
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_identical_clusterings():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    result = cluster_weisfeiler_lehman_nx(data, use_edge_node_attr=True)
+    comparison = compare_clusterings(result, result)
+    assert comparison["adjusted_rand_index"] == 1.0
+    assert comparison["split_clusters"] == {}
+    assert comparison["merged_clusters"] == {}
+
+
+def test_split_and_merged_clusters():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    reference = cluster_reactions(data)
+    candidate = cluster_weisfeiler_lehman_nx(data)
+    comparison = compare_clusterings(reference, candidate)
+
+    for key, candidate_keys in comparison["split_clusters"].items():
+        assert len(candidate_keys) > 1
+        assert len(cluster_weisfeiler_lehman_nx(reference[key])) > 1
+    if comparison["merged_clusters"]:
+        assert comparison["pair_precision"] < 1.0
+    else:
+        assert comparison["pair_precision"] == 1.0
@@ -0,0 +1,26 @@
+import networkx.algorithms.isomorphism as iso
+from src.rc_extract import get_rc_updated
+from src.substructure_index import SubstructureIndex
+from synutility.SynIO.data_type import load_from_pickle
+
+
+def test_search_matches_brute_force():
+    data = load_from_pickle("data/ITS_graphs.pkl.gz")[:1000]
+    index = SubstructureIndex()
+    index.add_reactions(data)
+    query = get_rc_updated(data[0]["ITS"]).copy()
+
+    node_match = iso.categorical_node_match(["element", "charge"], [None, None])
+    edge_match = iso.categorical_edge_match("order", None)
+    expected = [
+        idx
+        for idx, graph in enumerate(index.graphs)
+        if iso.GraphMatcher(
+            graph, query, node_match=node_match, edge_match=edge_match
+        ).subgraph_is_monomorphic()
+    ]
+
+    result = index.search(query)
+    assert 0 in result
+    assert result == expected
+    assert len(index.screen(query)) >= len(result)